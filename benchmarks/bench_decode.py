@@ -0,0 +1,49 @@
+"""消息事件解码基准测试
+
+对比旧的两次校验路径(`MessageEvent` → `convert`)与单次校验路径的吞吐量
+
+    python benchmarks/bench_decode.py
+"""
+
+from nonebot.compat import type_validate_python
+from nonebot.adapters.efchat.event import MessageEvent
+
+from common import bench
+
+CHANNEL = {
+    "cmd": "chat",
+    "nick": "alice",
+    "trip": "abcdef",
+    "level": 105,
+    "head": "https://efchat.irin-wakako.uk/imgs/ava.png",
+    "text": "@EFChatBot 你好 ![image](https://example.com/a.png) 今天天气不错",
+    "time": 1700000000,
+}
+WHISPER = {
+    "cmd": "chat",
+    "type": "whisper",
+    "from": "bob",
+    "nick": "bob",
+    "trip": "ghijkl",
+    "text": "hello",
+    "time": 1700000000,
+}
+
+
+def decode_two_pass(data: dict):
+    event = type_validate_python(MessageEvent, dict(data))
+    return event.convert(data)
+
+
+def decode_single_pass(data: dict):
+    return type_validate_python(MessageEvent.get_event_class(data), dict(data))
+
+
+if __name__ == "__main__":
+    for name, data in (("channel", CHANNEL), ("whisper", WHISPER)):
+        before = bench(decode_two_pass, data)
+        after = bench(decode_single_pass, data)
+        print(
+            f"{name:<8} before: {before:>10.0f} events/s  "
+            f"after: {after:>10.0f} events/s  ({after / before:.2f}x)"
+        )
@@ -0,0 +1,63 @@
+"""数据帧解码吞吐量对比
+
+- dict: `codec.loads` + `type_validate_python`(每次调用都会重新构建校验器)
+- cached: `codec.loads` + 预编译的校验器(`Adapter._decode_event` 当前的路径)
+- fast: 提取 `cmd` + 由原始数据帧直接校验(`EFCHAT_FAST_DECODE`，需要 pydantic v2)
+
+三种路径得到的事件完全一致。安装了 orjson/msgspec 时 cached 通常最快，
+fast 主要在仅有标准库 json 时有优势
+
+    python benchmarks/bench_fast_decode.py
+"""
+
+from nonebot.compat import model_dump, type_validate_python
+from nonebot.adapters.efchat import codec
+from nonebot.adapters.efchat.decoder import EventDecoder
+from nonebot.adapters.efchat.event import EVENT_CLASSES, MessageEvent
+
+from common import bench
+from corpus import FRAMES, WHISPER_FRAME
+
+decoder = EventDecoder()
+
+
+def _event_class(data: dict):
+    event_class = EVENT_CLASSES[data["cmd"]]
+    if event_class is MessageEvent:
+        event_class = MessageEvent.get_event_class(data)
+    return event_class
+
+
+def decode_dict(raw: str):
+    data = codec.loads(raw)
+    return type_validate_python(_event_class(data), data)
+
+
+def decode_cached(raw: str):
+    data = codec.loads(raw)
+    return decoder.validate_python(_event_class(data), data)
+
+
+def decode_fast(raw: str):
+    peeked = decoder.peek(raw)
+    assert peeked is not None
+    return decoder.validate_json(peeked[1], raw)
+
+
+if __name__ == "__main__":
+    frames = {**FRAMES, "chat/whisper": WHISPER_FRAME}
+    print(f"JSON backend: {codec.backend}")
+    print(f"{'cmd':<16} {'dict':>10} {'cached':>10} {'fast':>10}  events/s")
+    for name, frame in frames.items():
+        raw = codec.dumps(frame)
+        results = [decode_dict(raw), decode_cached(raw), decode_fast(raw)]
+        assert all(
+            type(event) is type(results[0])
+            and model_dump(event) == model_dump(results[0])
+            for event in results
+        ), name
+        rates = [bench(func, raw) for func in (decode_dict, decode_cached, decode_fast)]
+        print(
+            f"{name:<16} {rates[0]:>10.0f} {rates[1]:>10.0f} {rates[2]:>10.0f}  "
+            f"({rates[2] / rates[0]:.2f}x)"
+        )
@@ -0,0 +1,88 @@
+"""热点路径基准测试套件
+
+覆盖消息解析、事件解码、提及检测、发送格式化与消息渲染，
+结果以 ops/s 输出，pydantic v1 与 v2 下均可运行
+
+    python benchmarks/bench_suite.py [--seconds 1.0] [--filter 关键字]
+"""
+
+import argparse
+
+import nonebot
+from nonebot.compat import PYDANTIC_V2, type_validate_python
+from nonebot.matcher import current_event
+
+from common import bench, report
+from corpus import BOT_NICK, FRAMES, TEXTS, WHISPER_FRAME, chat_frame
+
+
+def _setup():
+    nonebot.init(
+        driver="~httpx+~websockets",
+        efchat_bots=[{"nick": BOT_NICK, "token": "benchmark"}],
+    )
+    from nonebot.adapters.efchat import Adapter, Bot
+
+    adapter = Adapter(nonebot.get_driver())
+    return adapter, Bot(adapter, BOT_NICK, adapter.cfg.efchat_bots[0])
+
+
+def cases(adapter, bot):
+    """生成 (名称, 函数, 参数) 形式的测试用例"""
+    from nonebot.adapters.efchat import codec
+    from nonebot.adapters.efchat.bot import _check_to_me, _format_send_message
+    from nonebot.adapters.efchat.event import MessageEvent
+    from nonebot.adapters.efchat.message import Message
+
+    for name in ("short", "long", "mention", "image"):
+        yield f"construct[{name}]", Message._construct, (TEXTS[name],)
+
+    for name in ("short", "long", "mention", "image"):
+        message = Message(TEXTS[name])
+        yield f"str(Message)[{name}]", str, (message,)
+
+    for cmd, frame in FRAMES.items():
+        yield f"decode[{cmd}]", lambda f: adapter._decode_event(dict(f)), (frame,)
+    yield (
+        "decode[chat/whisper]",
+        lambda f: adapter._decode_event(dict(f)),
+        (WHISPER_FRAME,),
+    )
+    raw = codec.dumps(FRAMES["chat"])
+    yield f"codec.loads[{codec.backend}]", codec.loads, (raw,)
+
+    for name, frame in (("channel", FRAMES["chat"]), ("whisper", WHISPER_FRAME)):
+        event = type_validate_python(MessageEvent, dict(frame))
+        yield f"convert[{name}]", event.convert, (frame,)
+
+    def _mention(text: str):
+        event = adapter._decode_event(chat_frame(text))
+        _check_to_me(bot, event)
+
+    for name in ("short", "long", "at_me", "nickname", "mention"):
+        yield f"decode+to_me[{name}]", _mention, (TEXTS[name],)
+
+    current_event.set(adapter._decode_event(dict(FRAMES["chat"])))
+    for at_sender, reply_message in ((False, False), (True, False), (True, True)):
+        yield (
+            f"format_send[at={at_sender},reply={reply_message}]",
+            _format_send_message,
+            (TEXTS["short"], at_sender, reply_message),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="每个用例的时长")
+    parser.add_argument("--filter", default="", help="仅运行名称包含该关键字的用例")
+    args = parser.parse_args()
+
+    adapter, bot = _setup()
+    print(f"pydantic {'v2' if PYDANTIC_V2 else 'v1'}")
+    for name, func, params in cases(adapter, bot):
+        if args.filter in name:
+            report(name, bench(func, *params, seconds=args.seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""基准测试公共工具"""
+
+import time
+from typing import Any, Callable, Optional
+
+
+def bench(func: Callable[..., Any], *args: Any, seconds: float = 1.0) -> float:
+    """在 `seconds` 秒内反复调用 `func(*args)`，返回每秒调用次数"""
+    # 先估算单次耗时，使计时循环本身的开销可以忽略
+    start = time.perf_counter()
+    func(*args)
+    batch = max(1, min(1000, int(0.01 / max(time.perf_counter() - start, 1e-9))))
+
+    count, start = 0, time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < seconds:
+        for _ in range(batch):
+            func(*args)
+        count += batch
+    return count / elapsed
+
+
+def report(name: str, ops: float, note: Optional[str] = None) -> None:
+    """输出一行 ops/s 结果"""
+    line = f"{name:<40} {ops:>12.0f} ops/s"
+    if note:
+        line += f"  {note}"
+    print(line)
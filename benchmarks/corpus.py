@@ -0,0 +1,125 @@
+"""基准测试使用的合成语料
+
+`FRAMES` 覆盖 `EVENT_CLASSES` 中注册的全部 `cmd`，`TEXTS` 覆盖常见的消息形态
+"""
+
+from typing import Any
+
+BOT_NICK = "EFChatBot"
+
+HEAD = "https://efchat.irin-wakako.uk/imgs/ava.png"
+
+_USER = {
+    "nick": "alice",
+    "trip": "abcdef",
+    "utype": "user",
+    "hash": "0123456789abcdef",
+    "level": 105,
+    "userid": 1001,
+    "channel": "NewPR",
+    "isme": False,
+}
+
+_HISTORY = {
+    "id": 1,
+    "channel": "NewPR",
+    "nick": "alice",
+    "content": "早上好",
+    "time": "2024-01-01 08:00:00",
+    "show": 1,
+    "head": HEAD,
+    "trip": "abcdef",
+}
+
+TEXTS: dict[str, str] = {
+    "short": "早上好",
+    "long": "今天的会议改到下午三点，请大家准时参加，记得带上周的报表。" * 40,
+    "mention": " ".join(f"@user{i} 收到请回复" for i in range(40)),
+    "image": " ".join(
+        f"![image](https://example.com/img/{i}.png) 第 {i} 张" for i in range(40)
+    ),
+    "at_me": f"@{BOT_NICK} 帮我查一下天气",
+    "nickname": f"{BOT_NICK}，帮我查一下天气",
+}
+"""不同形态的消息文本"""
+
+FRAMES: dict[str, dict[str, Any]] = {
+    "chat": {
+        "cmd": "chat",
+        "nick": "alice",
+        "trip": "abcdef",
+        "level": 105,
+        "head": HEAD,
+        "text": f"@{BOT_NICK} 你好 ![image](https://example.com/a.png) 今天天气不错",
+        "time": 1700000000,
+    },
+    "html": {
+        "cmd": "html",
+        "nick": "alice",
+        "text": "<b>公告</b>",
+        "time": 1700000000,
+    },
+    "info": {"cmd": "info", "text": "欢迎来到 NewPR", "time": 1700000000},
+    "warn": {"cmd": "warn", "text": "发送速度过快", "time": 1700000000},
+    "invite": {
+        "cmd": "invite",
+        "from": "alice",
+        "to": "secret",
+        "type": "invite",
+        "text": "alice 邀请你加入 secret",
+        "time": 1700000000,
+    },
+    "onlineAdd": {
+        "cmd": "onlineAdd",
+        "nick": "bob",
+        "trip": "ghijkl",
+        "city": "Shanghai",
+        "client": "web",
+        "hash": "fedcba9876543210",
+        "level": 105,
+        "userid": 1002,
+        "utype": "user",
+        "time": 1700000000,
+    },
+    "onlineRemove": {"cmd": "onlineRemove", "nick": "bob", "time": 1700000000},
+    "onlineSet": {
+        "cmd": "onlineSet",
+        "nicks": [f"user{i}" for i in range(50)],
+        "users": [{**_USER, "nick": f"user{i}", "userid": i} for i in range(50)],
+        "time": 1700000000,
+    },
+    "kill": {"cmd": "kill", "nick": "spammer", "time": 1700000000},
+    "unkill": {"cmd": "unkill", "nick": "spammer", "time": 1700000000},
+    "shout": {"cmd": "shout", "text": "服务器将于今晚维护", "time": 1700000000},
+    "onafkAdd": {"cmd": "onafkAdd", "nick": "alice", "time": 1700000000},
+    "onafkRemove": {"cmd": "onafkRemove", "nick": "alice", "time": 1700000000},
+    "onafkRemoveOnly": {
+        "cmd": "onafkRemoveOnly",
+        "nick": "alice",
+        "time": 1700000000,
+    },
+    "changenick": {"cmd": "changenick", "nick": "EFChatBot2", "time": 1700000000},
+    "list": {
+        "cmd": "list",
+        "text": [{**_HISTORY, "id": i} for i in range(20)],
+        "time": 1700000000,
+    },
+    "onpass": {"cmd": "onpass", "ispass": True, "time": 1700000000},
+}
+"""各 `cmd` 的示例数据帧"""
+
+WHISPER_FRAME: dict[str, Any] = {
+    "cmd": "chat",
+    "type": "whisper",
+    "from": "bob",
+    "nick": "bob",
+    "trip": "ghijkl",
+    "text": "hello",
+    "time": 1700000000,
+}
+"""私聊数据帧(与房间消息共用 `chat`)"""
+
+
+def chat_frame(text: str) -> dict[str, Any]:
+    """以 `text` 为内容的房间消息数据帧"""
+    return {**FRAMES["chat"], "text": text}
@@ -0,0 +1,422 @@
+"""本地 EFChat 模拟服务器
+
+实现适配器使用到的协议：`join`、`chat`、`whisper`、`ping`、`get_old`→`list`、
+`onlineSet`/`onlineAdd`/`onlineRemove`、`move`、`changenick`，以及 HTTP `/voice` 上传。
+可在多个房间中按指定速率生成模拟用户的消息与上下线事件，用于离线压力测试。
+
+    python benchmarks/fake_server.py --port 8765 --channels 4 --rate 200
+    # 适配器中设置
+    EFCHAT_WS_URL=ws://127.0.0.1:8765
+    EFCHAT_VOICE_URL=http://127.0.0.1:8766/voice
+"""
+
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import websockets
+
+HEAD = "https://efchat.irin-wakako.uk/imgs/ava.png"
+
+_PONG_RE = re.compile(r"pong (\d+)")
+
+
+@dataclass
+class Client:
+    ws: Any
+    nick: str
+    channel: str
+    trip: str = ""
+    userid: int = 0
+
+
+@dataclass
+class LoadStats:
+    generated: int = 0
+    """生成的模拟消息数量"""
+    delivered: int = 0
+    """投递给客户端的数据帧数量"""
+    received: dict[str, int] = field(default_factory=dict)
+    """按 cmd 统计收到的客户端指令数量"""
+    latencies: list[float] = field(default_factory=list)
+    """提及 Bot 到收到回复的延迟(秒)"""
+
+
+class FakeServer:
+    """EFChat 模拟服务器
+
+    Args:
+        channels: 模拟用户分布的房间数量
+        users: 每个房间的模拟用户数量
+        rate: 所有房间合计每秒生成的模拟消息数量
+        mention_ratio: 模拟消息中提及房间内 Bot 并等待 `pong <序号>` 回复的比例
+        presence_rate: 每秒生成的上下线事件数量
+        history: 每个房间保留的历史消息数量
+    """
+
+    def __init__(
+        self,
+        channels: int = 1,
+        users: int = 20,
+        rate: float = 0,
+        mention_ratio: float = 0.1,
+        presence_rate: float = 0,
+        history: int = 100,
+    ):
+        self.channel_names = [f"ch{i}" for i in range(channels)]
+        self.users = users
+        self.rate = rate
+        self.mention_ratio = mention_ratio
+        self.presence_rate = presence_rate
+        self.clients: dict[Any, Client] = {}
+        self.history: dict[str, deque] = {}
+        self.history_size = history
+        self.stats = LoadStats()
+        self._pending: dict[int, float] = {}
+        self._seq = 0
+        self._msg_id = 0
+        self._tasks: list[asyncio.Task] = []
+        self._servers: list[asyncio.AbstractServer] = []
+
+    # 连接与协议
+
+    def _members(self, channel: str) -> list[Client]:
+        return [c for c in self.clients.values() if c.channel == channel]
+
+    def _send(self, client: Client, data: dict[str, Any]) -> None:
+        websockets.broadcast([client.ws], json.dumps(data))
+        self.stats.delivered += 1
+
+    def _broadcast(self, channel: str, data: dict[str, Any]) -> None:
+        members = [c.ws for c in self._members(channel)]
+        if members:
+            websockets.broadcast(members, json.dumps(data))
+            self.stats.delivered += len(members)
+
+    def _user(self, client: Client) -> dict[str, Any]:
+        return {
+            "nick": client.nick,
+            "trip": client.trip,
+            "utype": "user",
+            "hash": hashlib.md5(client.nick.encode()).hexdigest(),
+            "level": 105,
+            "userid": client.userid,
+            "channel": client.channel,
+            "isme": False,
+        }
+
+    def _online_add(self, nick: str, trip: str, userid: int) -> dict[str, Any]:
+        return {
+            "cmd": "onlineAdd",
+            "nick": nick,
+            "trip": trip,
+            "city": "Localhost",
+            "client": "fake",
+            "hash": hashlib.md5(nick.encode()).hexdigest(),
+            "level": 105,
+            "userid": userid,
+            "utype": "user",
+            "time": int(time.time() * 1000),
+        }
+
+    def _chat(self, channel: str, nick: str, trip: str, text: str) -> dict[str, Any]:
+        self._msg_id += 1
+        data = {
+            "cmd": "chat",
+            "nick": nick,
+            "trip": trip,
+            "level": 105,
+            "head": HEAD,
+            "text": text,
+            "channel": channel,
+            "time": int(time.time() * 1000),
+        }
+        self.history.setdefault(channel, deque(maxlen=self.history_size)).append(
+            (self._msg_id, data)
+        )
+        return data
+
+    def _join(self, client: Client) -> None:
+        self._broadcast(
+            client.channel, self._online_add(client.nick, client.trip, client.userid)
+        )
+        self.clients[client.ws] = client
+        members = self._members(client.channel)
+        self._send(
+            client,
+            {
+                "cmd": "onlineSet",
+                "nicks": [c.nick for c in members],
+                "users": [{**self._user(c), "isme": c is client} for c in members],
+                "time": int(time.time() * 1000),
+            },
+        )
+
+    def _leave(self, client: Client) -> None:
+        self.clients.pop(client.ws, None)
+        self._broadcast(
+            client.channel,
+            {"cmd": "onlineRemove", "nick": client.nick, "time": int(time.time())},
+        )
+
+    def _handle(self, ws, data: dict[str, Any]) -> None:
+        cmd = str(data.get("cmd"))
+        self.stats.received[cmd] = self.stats.received.get(cmd, 0) + 1
+        client = self.clients.get(ws)
+        if cmd == "join":
+            nick = data.get("nick", "")
+            if client is None:
+                self._join(
+                    Client(
+                        ws,
+                        nick,
+                        data.get("channel", "lounge"),
+                        hashlib.md5(nick.encode()).hexdigest()[:6],
+                        len(self.clients) + 1,
+                    )
+                )
+            return
+        if client is None:
+            return
+        if cmd == "chat":
+            text = str(data.get("text", ""))
+            if m := _PONG_RE.search(text):
+                if (sent := self._pending.pop(int(m[1]), None)) is not None:
+                    self.stats.latencies.append(time.perf_counter() - sent)
+            self._broadcast(
+                client.channel,
+                {
+                    **self._chat(client.channel, client.nick, client.trip, text),
+                    "head": data.get("head", HEAD),
+                },
+            )
+        elif cmd == "whisper":
+            target = next(
+                (c for c in self.clients.values() if c.nick == data.get("nick")), None
+            )
+            if target is not None:
+                self._send(
+                    target,
+                    {
+                        "cmd": "chat",
+                        "type": "whisper",
+                        "from": client.nick,
+                        "nick": client.nick,
+                        "trip": client.trip,
+                        "text": str(data.get("text", "")),
+                        "time": int(time.time() * 1000),
+                    },
+                )
+        elif cmd == "get_old":
+            num = int(data.get("num", 20))
+            items = list(self.history.get(client.channel, ()))[-num:]
+            self._send(
+                client,
+                {
+                    "cmd": "list",
+                    "text": [
+                        {
+                            "id": msg_id,
+                            "channel": client.channel,
+                            "nick": item["nick"],
+                            "content": item["text"],
+                            "time": str(item["time"]),
+                            "show": 1,
+                            "head": item["head"],
+                            "trip": item["trip"],
+                        }
+                        for msg_id, item in reversed(items)
+                    ],
+                    "time": int(time.time() * 1000),
+                },
+            )
+        elif cmd == "move":
+            self._leave(client)
+            client.channel = str(data.get("channel", client.channel))
+            self._join(client)
+        elif cmd == "changenick":
+            nick = str(data.get("nick", client.nick))
+            if any(c.nick == nick for c in self.clients.values() if c is not client):
+                self._send(
+                    client, {"cmd": "warn", "text": "昵称已被占用", "time": 0}
+                )
+                return
+            old, client.nick = client.nick, nick
+            self._send(
+                client,
+                {"cmd": "changenick", "nick": client.nick, "time": int(time.time())},
+            )
+            for other in self._members(client.channel):
+                if other is not client:
+                    self._send(other, {"cmd": "onlineRemove", "nick": old, "time": 0})
+                    self._send(
+                        other, self._online_add(client.nick, client.trip, client.userid)
+                    )
+        # ping 无需回复，收到即视为连接存活
+
+    async def _serve_ws(self, ws) -> None:
+        try:
+            async for raw in ws:
+                try:
+                    data = json.loads(raw)
+                except ValueError:
+                    continue
+                if isinstance(data, dict):
+                    self._handle(ws, data)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if client := self.clients.get(ws):
+                self._leave(client)
+
+    async def _serve_http(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = re.search(rb"(?i)content-length:\s*(\d+)", head)
+            body = await reader.readexactly(int(length[1])) if length else b""
+            if head.startswith(b"POST /voice"):
+                self.stats.received["voice"] = self.stats.received.get("voice", 0) + 1
+                digest = hashlib.sha1(body).hexdigest()[:16]
+                status, payload = "200 OK", {"src": f"static/{digest}.mp3"}
+            else:
+                status, payload = "404 Not Found", {"error": "not found"}
+            content = json.dumps(payload).encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(content)}\r\nConnection: close\r\n\r\n".encode()
+                + content
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    # 负载生成
+
+    def _bots_in(self, channel: str) -> list[Client]:
+        return [c for c in self._members(channel) if not c.nick.startswith("user")]
+
+    def _generate_message(self) -> None:
+        channel = random.choice(self.channel_names)
+        nick = f"user{random.randrange(self.users)}"
+        bots = self._bots_in(channel)
+        if bots and random.random() < self.mention_ratio:
+            self._seq += 1
+            self._pending[self._seq] = time.perf_counter()
+            text = f"@{random.choice(bots).nick} ping {self._seq}"
+        else:
+            text = f"模拟消息 {random.randrange(1_000_000)} 来自 {nick}"
+        self.stats.generated += 1
+        self._broadcast(channel, self._chat(channel, nick, "fake00", text))
+
+    def _generate_presence(self) -> None:
+        channel = random.choice(self.channel_names)
+        userid = random.randrange(self.users)
+        nick = f"user{userid}"
+        if random.random() < 0.5:
+            self._broadcast(channel, self._online_add(nick, "fake00", userid))
+        else:
+            self._broadcast(
+                channel, {"cmd": "onlineRemove", "nick": nick, "time": int(time.time())}
+            )
+
+    async def _generate(self, rate: float, generate) -> None:
+        """按 `rate` 次每秒调用 `generate`，落后时批量补齐"""
+        loop = asyncio.get_running_loop()
+        start, done = loop.time(), 0
+        while True:
+            due = int((loop.time() - start) * rate)
+            for _ in range(due - done):
+                generate()
+            done = max(done, due)
+            await asyncio.sleep(min(1 / rate, 0.01))
+
+    def start_load(self) -> None:
+        """开始生成模拟消息与上下线事件"""
+        if self.rate > 0:
+            self._tasks.append(
+                asyncio.create_task(self._generate(self.rate, self._generate_message))
+            )
+        if self.presence_rate > 0:
+            self._tasks.append(
+                asyncio.create_task(
+                    self._generate(self.presence_rate, self._generate_presence)
+                )
+            )
+
+    async def stop_load(self) -> None:
+        """停止生成负载"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 0, http_port: Optional[int] = None
+    ) -> tuple[int, int]:
+        """启动 WebSocket 与 HTTP 服务，返回实际监听的端口"""
+        ws_server = await websockets.serve(self._serve_ws, host, port)
+        if http_port is None:
+            http_port = port + 1 if port else 0
+        http_server = await asyncio.start_server(self._serve_http, host, http_port)
+        self._servers = [ws_server, http_server]
+        return (
+            ws_server.sockets[0].getsockname()[1],
+            http_server.sockets[0].getsockname()[1],
+        )
+
+    async def close(self) -> None:
+        """停止负载生成并关闭服务"""
+        await self.stop_load()
+        for server in self._servers:
+            server.close()
+        self._servers.clear()
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server = FakeServer(
+        args.channels, args.users, args.rate, args.mention_ratio, args.presence_rate
+    )
+    ws_port, http_port = await server.start(args.host, args.port)
+    print(f"WebSocket: ws://{args.host}:{ws_port}")
+    print(f"Voice:     http://{args.host}:{http_port}/voice")
+    server.start_load()
+    try:
+        while True:
+            await asyncio.sleep(5)
+            stats = server.stats
+            print(
+                f"clients: {len(server.clients)}  generated: {stats.generated}  "
+                f"delivered: {stats.delivered}  replies: {len(stats.latencies)}"
+            )
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 EFChat 模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="WebSocket 端口")
+    parser.add_argument("--channels", type=int, default=1, help="房间数量")
+    parser.add_argument("--users", type=int, default=20, help="每个房间的模拟用户数")
+    parser.add_argument("--rate", type=float, default=0, help="每秒生成的消息数量")
+    parser.add_argument(
+        "--mention-ratio", type=float, default=0.1, help="提及 Bot 的消息比例"
+    )
+    parser.add_argument(
+        "--presence-rate", type=float, default=0, help="每秒生成的上下线事件数量"
+    )
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,123 @@
+"""端到端压力测试
+
+启动本地模拟服务器(见 `fake_server.py`)，让 N 个 Bot 通过真实的适配器连接，
+在持续的消息负载下统计 Bot 实际处理的事件吞吐量与提及回复延迟
+
+    python benchmarks/load_test.py --bots 8 --channels 4 --rate 500 --duration 10
+"""
+
+import re
+import time
+import asyncio
+import argparse
+
+import nonebot
+from nonebot.message import event_preprocessor
+
+from fake_server import FakeServer
+
+_PING_RE = re.compile(r"ping (\d+)")
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+async def run(args: argparse.Namespace) -> None:
+    server = FakeServer(
+        args.channels, args.users, args.rate, args.mention_ratio, args.presence_rate
+    )
+    ws_port, http_port = await server.start()
+
+    nonebot.init(
+        driver="~httpx+~websockets",
+        log_level=args.log_level,
+        efchat_ws_url=f"ws://127.0.0.1:{ws_port}",
+        efchat_voice_url=f"http://127.0.0.1:{http_port}/voice",
+        efchat_connect_stagger=0,
+        efchat_dispatch_workers=args.workers,
+        efchat_bots=[
+            {
+                "nick": f"bot{i}",
+                "token": "load-test",
+                "channel": f"ch{i % args.channels}",
+                "send_rate": args.send_rate,
+            }
+            for i in range(args.bots)
+        ],
+    )
+    from nonebot import on_message
+    from nonebot.rule import to_me
+    from nonebot.adapters.efchat import Adapter, Bot
+    from nonebot.adapters.efchat.event import MessageEvent
+
+    handled = 0
+
+    @event_preprocessor
+    async def _count():
+        nonlocal handled
+        handled += 1
+
+    pong = on_message(rule=to_me())
+
+    @pong.handle()
+    async def _(bot: Bot, event: MessageEvent):
+        if m := _PING_RE.search(event.get_plaintext()):
+            await bot.send_chat_message(f"pong {m[1]}")
+
+    adapter = Adapter(nonebot.get_driver())
+    await adapter.connect_ws()
+    while len(adapter.bots) < args.bots:
+        await asyncio.sleep(0.05)
+
+    handled = 0
+    server.start_load()
+    start = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    await server.stop_load()
+    elapsed = time.perf_counter() - start
+    # 留出时间处理剩余的回复
+    await asyncio.sleep(0.5)
+
+    stats = server.stats
+    latencies = stats.latencies
+    print(
+        f"bots: {args.bots}  channels: {args.channels}  "
+        f"target rate: {args.rate:.0f} msg/s  duration: {elapsed:.1f}s"
+    )
+    print(
+        f"generated: {stats.generated}  delivered frames: {stats.delivered}  "
+        f"handled events: {handled} ({handled / elapsed:.0f} events/s)"
+    )
+    print(
+        f"replies: {len(latencies)}/{len(latencies) + len(server._pending)}  "
+        f"latency p50: {_percentile(latencies, 50) * 1000:.2f}ms  "
+        f"p90: {_percentile(latencies, 90) * 1000:.2f}ms  "
+        f"p99: {_percentile(latencies, 99) * 1000:.2f}ms"
+    )
+    await adapter.shutdown()
+    await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EFChat 适配器端到端压力测试")
+    parser.add_argument("--bots", type=int, default=4, help="Bot 数量")
+    parser.add_argument("--channels", type=int, default=2, help="房间数量")
+    parser.add_argument("--users", type=int, default=50, help="每个房间的模拟用户数")
+    parser.add_argument("--rate", type=float, default=200, help="每秒生成的消息数量")
+    parser.add_argument(
+        "--mention-ratio", type=float, default=0.1, help="提及 Bot 的消息比例"
+    )
+    parser.add_argument(
+        "--presence-rate", type=float, default=0, help="每秒生成的上下线事件数量"
+    )
+    parser.add_argument("--duration", type=float, default=10, help="持续时间(秒)")
+    parser.add_argument("--workers", type=int, default=16, help="事件并发处理数量")
+    parser.add_argument(
+        "--send-rate", type=float, default=0, help="Bot 发送限速，0 表示不限速"
+    )
+    parser.add_argument("--log-level", default="WARNING")
+    asyncio.run(run(parser.parse_args()))
@@ -1,8 +1,10 @@
 import contextlib
-import json
 import re
+import time
+import random
 import asyncio
-from typing import Any, Optional
+from functools import partial
+from typing import Any, Callable, Literal, Optional, Union
 from nonebot import get_plugin_config
 from nonebot.adapters import Adapter as BaseAdapter
 from nonebot.exception import WebSocketClosed
@@ -13,7 +15,6 @@ from nonebot.drivers import (
     HTTPClientMixin,
     WebSocket,
 )
-from nonebot.compat import type_validate_python
 
 from .models import EFChatBotConfig
 
@@ -21,21 +22,43 @@ from .config import Config
 from .bot import Bot
 from .event import (
     MessageEvent,
+    ChannelMessageEvent,
+    WhisperMessageEvent,
     EVENT_CLASSES,
     Event,
 )
-from .utils import logger, sanitize
+from .send_queue import SendQueue
+from .dispatcher import Dispatcher
+from .history import HistoryStore
+from .correlation import REPLY_CMDS, ReplyWaiter
+from .voice_cache import VoiceCache
+from .heartbeat import Heartbeat
+from .metrics import Labels, Metrics, serve_metrics
+from .recorder import FrameRecorder
+from .decoder import EventDecoder
+from .http_session import HTTPSession
+from .exception import NetworkError
+from . import codec
+from .utils import LogRateLimiter, enable_async_logging, logger, sanitize
 
 
-async def heartbeat(adapter: "Adapter", bot: Bot):
-    """发送心跳包"""
-    while True:
-        try:
-            await asyncio.sleep(delay=30)
-            await adapter.send_packet(bot, {"cmd": "ping"})
-        except Exception as e:
-            logger.error(f"心跳包发送失败: {e}")
-            break
+ConnectionState = Literal["connecting", "online", "backing-off", "stopped"]
+
+
+def _chat_sender(data: dict[str, Any]) -> Optional[str]:
+    """`chat` 数据帧的发送者，判断方式与 `MessageEvent.get_event_class` 一致"""
+    if data.get("type") == "whisper" and data.get("from") is not None:
+        return data["from"]
+    return data.get("nick")
+
+
+def _session_key(bot: Bot, event: Event) -> str:
+    """事件的分发顺序键，无会话的事件按 Bot 统一排序"""
+    try:
+        session = event.get_session_id()
+    except ValueError:
+        session = ""
+    return f"{bot.self_id}:{session}"
 
 
 class Adapter(BaseAdapter):
@@ -44,8 +67,63 @@ class Adapter(BaseAdapter):
     def __init__(self, driver: Driver, **kwargs):
         super().__init__(driver, **kwargs)
         self.cfg = get_plugin_config(Config)
-        self.task: Optional[asyncio.Task] = None
+        self.tasks: dict[str, asyncio.Task] = {}
+        """各 Bot 的连接任务，以配置中的原始昵称为键(改名后不变)"""
+        self.connection_states: dict[str, ConnectionState] = {}
+        """各 Bot 的连接状态，以配置中的原始昵称为键(改名后不变)"""
+        self._bot_configs: dict[str, EFChatBotConfig] = {}
         self.bots_ws: dict[Bot, WebSocket] = {}
+        self.send_queues: dict[Bot, SendQueue] = {}
+        self.reply_waiters: dict[Bot, ReplyWaiter] = {}
+        self.heartbeats: dict[Bot, Heartbeat] = {}
+        self.metrics = Metrics(
+            self.cfg.efchat_metrics or self.cfg.efchat_metrics_port is not None
+        )
+        self._metrics_server: Optional[asyncio.AbstractServer] = None
+        # 为 0 时也交给分发器依次处理，使接收循环始终可以关联 API 回复，
+        # 事件处理中等待回复(如 change_nick)不会阻塞自身
+        self.dispatcher = Dispatcher(
+            max(self.cfg.efchat_dispatch_workers, 1),
+            self.cfg.efchat_dispatch_max_pending,
+        )
+        self._serial_dispatch = self.cfg.efchat_dispatch_workers <= 0
+        """是否按接收顺序依次处理全部事件"""
+        self.history: Optional[HistoryStore] = (
+            HistoryStore(self.cfg.efchat_history_path)
+            if self.cfg.efchat_history_path
+            else None
+        )
+        self.recorder: Optional[FrameRecorder] = (
+            FrameRecorder(self.cfg.efchat_record_path)
+            if self.cfg.efchat_record_path
+            else None
+        )
+        self.decoder = EventDecoder()
+        self.fast_decode = self.cfg.efchat_fast_decode and self.decoder.supports_json
+        """是否由原始数据帧直接校验为事件"""
+        if self.cfg.efchat_fast_decode and not self.fast_decode:
+            logger.warning("快速解码需要 pydantic v2，已退回普通解析路径")
+        rate = self.cfg.efchat_log_frame_rate
+        self._recv_log_limiter = LogRateLimiter(rate) if rate > 0 else None
+        """逐帧接收日志的限流器"""
+        self._frame_error_limiter = LogRateLimiter(rate) if rate > 0 else None
+        """逐帧解析与处理错误日志的限流器"""
+        self.voice_cache: Optional[VoiceCache] = (
+            VoiceCache(
+                self.cfg.efchat_voice_cache_size,
+                self.cfg.efchat_voice_cache_ttl,
+                self.cfg.efchat_voice_cache_path,
+            )
+            if self.cfg.efchat_voice_cache_size > 0
+            else None
+        )
+        self.http = HTTPSession(
+            driver,  # type: ignore[arg-type]
+            self.cfg.efchat_http_timeout,
+            self.cfg.efchat_http_retries,
+            self.cfg.efchat_http_concurrency,
+        )
+        """语音上传与下载共用的 HTTP 会话"""
         self.setup()
 
     @classmethod
@@ -58,95 +136,361 @@ class Adapter(BaseAdapter):
             raise RuntimeError(f"{self.get_name()} 需要 WebSocket Client Driver!")
         elif not isinstance(self.driver, HTTPClientMixin):
             raise RuntimeError(f"{self.get_name()} 需要 HTTP Client Driver!")
+        if self.cfg.efchat_log_async and not enable_async_logging():
+            logger.warning("NoneBot 默认日志输出已被替换，无法启用异步日志")
         self.on_ready(self.connect_ws)
         self.driver.on_shutdown(self.shutdown)
 
     async def connect_ws(self):
-        """连接 WebSocket"""
-        for bot in self.cfg.efchat_bots:
-            self.task = asyncio.create_task(self._forward_ws(bot))
+        """为每个 Bot 启动独立的连接任务，并错开启动时间"""
+        if self.cfg.efchat_metrics_port is not None:
+            try:
+                self._metrics_server = await serve_metrics(
+                    self.get_metrics,
+                    self.cfg.efchat_metrics_host,
+                    self.cfg.efchat_metrics_port,
+                )
+            except OSError as e:
+                # 端口被占用等情况不应影响 Bot 连接
+                logger.error(f"指标服务启动失败: {e}")
+        for index, bot in enumerate(self.cfg.efchat_bots):
+            key = bot.nick
+            self._bot_configs[key] = bot
+            self.connection_states[key] = "connecting"
+            self.tasks[key] = asyncio.create_task(
+                self._forward_ws(bot, key, index * self.cfg.efchat_connect_stagger)
+            )
+
+    def get_connection_state(self, nick: str) -> Optional[ConnectionState]:
+        """获取 Bot 的连接状态，`nick` 可以是配置中的原始昵称或改名后的当前昵称"""
+        if (state := self.connection_states.get(nick)) is not None:
+            return state
+        for key, cfg in self._bot_configs.items():
+            if cfg.nick == nick:
+                return self.connection_states.get(key)
+        return None
 
     async def _call_api(self, bot: Bot, api: str, **kwargs):
-        logger.debug(f"Bot {bot.nick} calling API <y>{api}</y>")
-        await self.send_packet(bot, {"cmd": api, **kwargs})
+        """发送指令，若指令有对应的服务器回复则等待并返回回复事件"""
+        logger.debug(lambda: f"Bot {bot.self_id} calling API <y>{api}</y>")
+        return await self._request(bot, api, kwargs)
+
+    async def _request(
+        self, bot: Bot, api: str, params: dict[str, Any], internal: bool = False
+    ):
+        """发送指令并等待回复，`internal` 的回复只交给调用方而不分发给插件"""
+        data = {"cmd": api, **params}
+        if (reply_cmd := REPLY_CMDS.get(api)) is None:
+            await self.send_packet(bot, data)
+            return None
 
-    async def _forward_ws(self, cfg: EFChatBotConfig):
-        """WebSocket 连接维护"""
-        url = "wss://efchat.irin-wakako.uk/ws"
+        waiter = self.reply_waiters[bot]
+        future = waiter.expect(reply_cmd, internal)
+        try:
+            await self.send_packet(bot, data)
+            return await asyncio.wait_for(future, self.cfg.efchat_api_timeout)
+        except asyncio.TimeoutError as e:
+            raise NetworkError(f"API {api} 等待 {reply_cmd} 回复超时") from e
+        finally:
+            waiter.discard(reply_cmd, future)
+
+    def _backoff(self, attempt: int) -> float:
+        """第 `attempt` 次重连前的等待时间：带抖动的指数退避"""
+        delay = min(
+            self.cfg.efchat_reconnect_max, self.cfg.efchat_reconnect_base * 2**attempt
+        )
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _forward_ws(self, cfg: EFChatBotConfig, key: str, delay: float = 0):
+        """WebSocket 连接维护，`key` 为连接状态的键，不随改名变化"""
         pwd = cfg.password
         token = cfg.token
-        request = Request(method="GET", url=url)
-        tasks = []
+        request = Request(method="GET", url=self.cfg.efchat_ws_url)
+        if not token:
+            logger.error(f"Bot {cfg.nick}: Token是必填项")
+            self.connection_states[key] = "stopped"
+            return
 
+        await asyncio.sleep(delay)
+        loop = asyncio.get_running_loop()
+        attempt = 0
         while True:  # 自动重连
+            bot: Optional[Bot] = None
+            tasks: list[asyncio.Task] = []
+            online_at = None
+            self.connection_states[key] = "connecting"
             try:
                 async with self.websocket(request) as ws:
                     logger.success("WebSocket 连接已建立")
-                    for task in tasks:
-                        if not task.done():
-                            try:
-                                task.cancel()
-                            except Exception as e:
-                                logger.warning(
-                                    f"任务 {task.get_coro().__name__} 终止失败: {e}"
-                                )
-                        tasks.clear()
                     login_data = {
                         "cmd": "join",
                         "nick": cfg.nick,
                         "head": cfg.head,
                         "channel": cfg.channel,
                         "client_key": "EFChat_Bot",
+                        "token": token,
                     }
                     if pwd:
                         login_data["password"] = pwd
-                    if token:
-                        login_data["token"] = token
-                    else:
-                        raise ValueError("Token是必填项")
 
                     bot = self._handle_connect(cfg)
                     self.bots_ws[bot] = ws
+                    self.send_queues[bot] = SendQueue(
+                        partial(self._send_frame, bot, ws),
+                        cfg.send_rate,
+                        cfg.send_burst,
+                        cfg.send_queue_size,
+                        self.cfg.efchat_coalesce_window,
+                        self.cfg.efchat_coalesce_max_length,
+                    )
+                    self.send_queues[bot].start()
+                    self.reply_waiters[bot] = ReplyWaiter()
+                    hb = Heartbeat(
+                        self.cfg.efchat_heartbeat_interval,
+                        self.cfg.efchat_heartbeat_timeout,
+                    )
+                    self.heartbeats[bot] = hb
                     await self.send_packet(bot, login_data)
-                    tasks.append(asyncio.create_task(heartbeat(self, bot)))
+                    self.connection_states[key] = "online"
+                    online_at = loop.time()
 
-                    while True:
-                        raw_data = await ws.receive()
-                        logger.debug(f"接收到数据: {raw_data}")
-                        try:
-                            data = json.loads(raw_data)
-                            await self._handle_data(bot, data)
-                        except json.JSONDecodeError:
-                            logger.warning(f"数据包解析失败: {raw_data}")
+                    receiver = asyncio.create_task(self._receive(bot, ws, hb))
+                    pinger = asyncio.create_task(
+                        hb.run(
+                            partial(self.send_packet, bot, {"cmd": "ping"}),
+                            # 服务器不回复 ping，以有确定回复的 get_old 探测连接
+                            partial(self._request, bot, "get_old", {"num": 1}, True),
+                        )
+                    )
+                    tasks += [receiver, pinger]
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    if receiver.done():
+                        receiver.result()
+                    # 接收循环未结束而心跳循环结束，说明连接已失效
+                    raise NetworkError("心跳超时，连接已失效")
 
             except WebSocketClosed as e:
                 logger.error(f"WebSocket 关闭: {e}")
-                self._handle_disconnect(bot)
-                await asyncio.sleep(5)
             except Exception as e:
                 logger.error(f"WebSocket 错误: {e}")
-                self._handle_disconnect(bot)
-                await asyncio.sleep(5)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                if bot is not None:
+                    await self._release_bot(bot)
+                    self._handle_disconnect(bot)
 
-    async def _handle_data(self, bot: Bot, data):
-        """处理事件"""
-        try:
-            cmd = data["cmd"]
-            if cmd not in EVENT_CLASSES:
+            # 连接稳定保持过一段时间后，重新从最短的退避时间开始
+            if (
+                online_at is not None
+                and loop.time() - online_at >= self.cfg.efchat_reconnect_max
+            ):
+                attempt = 0
+            wait = self._backoff(attempt)
+            attempt += 1
+            if self.metrics.enabled:
+                self.metrics.inc("efchat_reconnects_total", (("bot", cfg.nick),))
+            self.connection_states[key] = "backing-off"
+            logger.info(f"Bot {cfg.nick} 将在 {wait:.1f} 秒后重连")
+            await asyncio.sleep(wait)
+
+    async def _receive(self, bot: Bot, ws: WebSocket, hb: Heartbeat):
+        """接收循环"""
+        while True:
+            raw_data = await ws.receive()
+            hb.on_frame()
+            if self.recorder:
+                self.recorder.record(bot.self_id, "in", raw_data)
+            logger.debug(lambda: f"接收到数据: {raw_data}", self._recv_log_limiter)
+            if self.fast_decode and (peeked := self.decoder.peek(raw_data)):
+                await self._handle_raw(bot, raw_data, *peeked)
+                continue
+            try:
+                if self.metrics.enabled:
+                    start = time.perf_counter()
+                    data = codec.loads(raw_data)
+                    self.metrics.observe(
+                        "efchat_json_decode_seconds", time.perf_counter() - start
+                    )
+                else:
+                    data = codec.loads(raw_data)
+                await self._handle_data(bot, data)
+            except codec.DecodeError:
                 logger.warning(
-                    f"received unsupported event <r><bg #f8bbd0>{cmd}"
-                    f"</bg #f8bbd0></r>: {sanitize(str(data))}",
+                    lambda: f"数据包解析失败: {raw_data}", self._frame_error_limiter
                 )
-                event = type_validate_python(Event, data)
-                event.cmd = cmd
-            else:
-                event = type_validate_python(EVENT_CLASSES[cmd], data)
-                if isinstance(event, MessageEvent):
-                    event = event.convert(data)
-                await Bot.handle_event(bot, event)
 
+    def _decode_event(self, data: dict[str, Any]) -> Optional[Event]:
+        """将数据包解析为事件，不支持的事件返回 `None`"""
+        cmd = data["cmd"]
+        if cmd not in EVENT_CLASSES:
+            logger.warning(
+                lambda: f"received unsupported event <r><bg #f8bbd0>{cmd}"
+                f"</bg #f8bbd0></r>: {sanitize(str(data))}",
+                self._frame_error_limiter,
+            )
+            return None
+        event_class = EVENT_CLASSES[cmd]
+        if event_class is MessageEvent:
+            event_class = MessageEvent.get_event_class(data)
+        return self._validate(event_class, data, self.decoder.validate_python)
+
+    def _validate(self, event_class: type[Event], data: Any, validate) -> Event:
+        """校验事件，启用指标时统计耗时"""
+        if not self.metrics.enabled:
+            return validate(event_class, data)
+        start = time.perf_counter()
+        event = validate(event_class, data)
+        self.metrics.observe(
+            "efchat_event_validate_seconds",
+            time.perf_counter() - start,
+            (("event", event_class.__name__),),
+        )
+        return event
+
+    async def _handle_data(
+        self, bot: Bot, data, on_handled: Optional[Callable[[], None]] = None
+    ):
+        """处理事件
+
+        事件交由分发器按会话排队处理，不会等待插件执行完毕；
+        `on_handled` 会在插件处理完成后调用(用于回放统计延迟)
+        """
+        try:
+            cmd = data.get("cmd")
+            if self.metrics.enabled:
+                self.metrics.inc("efchat_frames_received_total", (("cmd", str(cmd)),))
+            sender = _chat_sender(data) if cmd == "chat" else None
+            if (filtered := self._filtered(bot, cmd, sender)) is None:
+                return
+            event = self._decode_event(data)
+            if event is None:
+                return
+            await self._process_event(bot, event, not filtered, on_handled)
         except Exception as e:
-            logger.error(f"事件处理错误: {type(e)}: {e}")
+            self._drop_event(e)
+
+    async def _handle_raw(
+        self,
+        bot: Bot,
+        raw: Union[str, bytes],
+        cmd: str,
+        event_class: type[Event],
+        on_handled: Optional[Callable[[], None]] = None,
+    ):
+        """处理事件(快速解码路径)，由原始数据帧直接校验为事件"""
+        try:
+            if self.metrics.enabled:
+                self.metrics.inc("efchat_frames_received_total", (("cmd", cmd),))
+            sender = None
+            if cmd == "chat" and bot.cfg.ignore_self:
+                sender = self.decoder.peek_string(
+                    raw, "from" if event_class is WhisperMessageEvent else "nick"
+                )
+            if (filtered := self._filtered(bot, cmd, sender)) is None:
+                return
+            event = self._validate(event_class, raw, self.decoder.validate_json)
+            await self._process_event(bot, event, not filtered, on_handled)
+        except Exception as e:
+            self._drop_event(e)
+
+    def _filtered(self, bot: Bot, cmd: Any, sender: Optional[str]) -> Optional[bool]:
+        """
+        在校验为事件之前过滤数据帧：未订阅的 `cmd` 与自身发送的消息
+
+        返回 `None` 表示直接丢弃；正在等待的 API 回复即使被过滤也需要解析，
+        此时返回 `True`，事件仅交给等待者而不分发
+        """
+        cfg = bot.cfg
+        if not (
+            (cfg.include_cmds is not None and cmd not in cfg.include_cmds)
+            or cmd in cfg.exclude_cmds
+            # 启用聊天记录时仍需解析自身消息以便记录
+            or (cfg.ignore_self and sender == cfg.nick and not self.history)
+        ):
+            return False
+        if (waiter := self.reply_waiters.get(bot)) and waiter.pending(cmd):
+            return True
+        if self.metrics.enabled:
+            self.metrics.inc("efchat_frames_filtered_total", (("cmd", str(cmd)),))
+        return None
+
+    async def _process_event(
+        self,
+        bot: Bot,
+        event: Event,
+        dispatch: bool = True,
+        on_handled: Optional[Callable[[], None]] = None,
+    ):
+        """更新在线名单、关联 API 回复、记录聊天记录并分发事件"""
+        bot.roster.apply(event, bot.cfg.nick, bot.cfg.channel)
+        if waiter := self.reply_waiters.get(bot):
+            if waiter.internal(event.cmd):
+                # 心跳探测的回复
+                waiter.resolve(event)
+                return
+            waiter.resolve(event)
+        if self.history and self._history_owner(bot, event):
+            self.history.record(event, bot.cfg.channel)
+        if not dispatch:
+            return
+        key = "" if self._serial_dispatch else _session_key(bot, event)
+        if not self.dispatcher.submit(
+            key, partial(self._handle_event, bot, event, on_handled)
+        ):
+            if self.metrics.enabled:
+                self.metrics.inc("efchat_events_overflow_total")
+            logger.warning(
+                lambda: f"会话 {key} 积压的事件超过 "
+                f"{self.dispatcher.max_pending} 个，已丢弃: {event.get_event_name()}",
+                self._frame_error_limiter,
+            )
+
+    def _history_owner(self, bot: Bot, event: Event) -> bool:
+        """同一房间的实时消息会被房间内的每个 Bot 收到，只由其中第一个 Bot 记录"""
+        if not isinstance(event, ChannelMessageEvent):
+            return True
+        channel = bot.cfg.channel
+        for other in self.bots_ws:
+            if other.cfg.channel == channel:
+                return other is bot
+        return True
+
+    def _drop_event(self, e: Exception):
+        if self.metrics.enabled:
+            self.metrics.inc("efchat_events_dropped_total")
+        logger.error(lambda: f"事件处理错误: {type(e)}: {e}", self._frame_error_limiter)
+
+    async def _handle_event(
+        self,
+        bot: Bot,
+        event: Event,
+        on_handled: Optional[Callable[[], None]] = None,
+    ):
+        """交由 Bot 处理事件"""
+        start = time.perf_counter()
+        try:
+            await bot.handle_event(event)
+        finally:
+            if self.metrics.enabled:
+                self.metrics.observe(
+                    "efchat_event_handle_seconds",
+                    time.perf_counter() - start,
+                    (("event", type(event).__name__),),
+                )
+            if on_handled is not None:
+                on_handled()
+
+    def get_metrics(self) -> str:
+        """以 Prometheus 文本格式获取适配器指标"""
+        gauges: dict[str, dict[Labels, float]] = {
+            "efchat_send_queue_depth": {
+                (("bot", bot.self_id),): queue.depth
+                for bot, queue in self.send_queues.items()
+            },
+            "efchat_dispatch_pending": {(): self.dispatcher.pending},
+        }
+        return self.metrics.render(gauges)
 
     async def _handle_captcha(self, bot, data):
         """处理验证码事件"""
@@ -162,9 +506,20 @@ class Adapter(BaseAdapter):
 
     async def shutdown(self) -> None:
         """关闭 WebSocket"""
-        if self.task and not self.task.done():
-            self.task.cancel()
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.tasks.clear()
+        if self._metrics_server:
+            self._metrics_server.close()
+        await self.dispatcher.shutdown()
+        if self.history:
+            await self.history.close()
+        if self.recorder:
+            await self.recorder.close()
+        await self.http.close()
         for _, bot in self.bots.copy().items():
+            await self._release_bot(bot)
             self._handle_disconnect(bot)
 
     def _handle_connect(self, bot):
@@ -180,6 +535,26 @@ class Adapter(BaseAdapter):
             self.bot_disconnect(bot)
         logger.info(f"Bot {bot.self_id} 已断开")
 
+    async def _release_bot(self, bot):
+        """停止 Bot 的发送队列，并使等待中的 API 调用失败"""
+        if queue := self.send_queues.pop(bot, None):
+            await queue.close()
+        if waiter := self.reply_waiters.pop(bot, None):
+            waiter.fail_all(NetworkError("连接已断开"))
+        self.heartbeats.pop(bot, None)
+        self.bots_ws.pop(bot, None)
+
+    async def _send_frame(self, bot: Bot, ws: WebSocket, data: dict[str, Any]):
+        """序列化并写入数据帧"""
+        raw = codec.dumps(data)
+        await ws.send(raw)
+        if self.recorder:
+            self.recorder.record_sent(bot.self_id, data, raw)
+        if self.metrics.enabled:
+            self.metrics.inc(
+                "efchat_frames_sent_total", (("cmd", str(data.get("cmd"))),)
+            )
+
     async def send_packet(self, bot: Bot, data: dict[str, Any]):
-        """发送数据包"""
-        await self.bots_ws[bot].send(json.dumps(data))
+        """将数据包放入 Bot 的发送队列，并等待其发送完成"""
+        await self.send_queues[bot].put(data)
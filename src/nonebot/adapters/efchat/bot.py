@@ -1,11 +1,21 @@
-import re
-from typing import TYPE_CHECKING, Union
+import asyncio
+from typing import TYPE_CHECKING, Any, Optional, Union
 from nonebot.adapters import Bot as BaseBot
 from nonebot.message import handle_event
 from nonebot.matcher import current_event
-from .models import EFChatBotConfig
-from .event import Event, ChannelMessageEvent, WhisperMessageEvent, MessageEvent
+from nonebot.exception import ApiNotAvailable
+from .models import EFChatBotConfig, OnlineUser, ChatHistory
+from .event import (
+    Event,
+    ChannelMessageEvent,
+    WhisperMessageEvent,
+    MessageEvent,
+    ChangeNickEvent,
+    ListHistoryEvent,
+)
 from .message import Message, MessageSegment
+from .roster import Roster
+from .mention import MentionMatcher
 from .utils import logger, upload_voice
 
 if TYPE_CHECKING:
@@ -38,6 +48,27 @@ class Bot(BaseBot):
     def __init__(self, adapter: "Adapter", self_id: str, cfg: EFChatBotConfig):
         super().__init__(adapter, self_id)
         self.cfg = cfg
+        self.roster = Roster()
+        """当前房间的在线用户名单"""
+        self._mention_key: Optional[tuple[str, set[str]]] = None
+        self._mention_matcher: Optional[MentionMatcher] = None
+
+    @property
+    def to_me_matcher(self) -> MentionMatcher:
+        """由当前昵称与全局 `NICKNAME` 构建的提及匹配器，仅在昵称变化后重新构建"""
+        nicknames = self.config.nickname
+        key = self._mention_key
+        if (
+            self._mention_matcher is None
+            or key is None
+            or key[0] != self.cfg.nick
+            or key[1] != nicknames
+        ):
+            self._mention_matcher = MentionMatcher(
+                {self.cfg.nick, *nicknames}, {self.self_id, self.cfg.nick}
+            )
+            self._mention_key = (self.cfg.nick, set(nicknames))
+        return self._mention_matcher
 
     async def send(
         self,
@@ -46,9 +77,7 @@ class Bot(BaseBot):
         at_sender: bool = False,
         reply_message: bool = False,
     ):
-        """自适应发送消息"""
-
-        voice_segment = None
+        """自适应发送消息，语音消息段会单独发送，其余内容按原顺序分段发送"""
 
         def target_method(event: MessageEvent, message: Message):
             if isinstance(event, ChannelMessageEvent):
@@ -57,30 +86,74 @@ class Bot(BaseBot):
                 return self.send_whisper_message(event.nick, message)
             raise ValueError(f"Unsupported MessageEvent type: {type(event)}")
 
-        if isinstance(message, Message):
-            for segment in message:
-                if segment.type == "voice":
-                    voice_segment = segment
-                    break
-
-        elif isinstance(message, MessageSegment) and message.type == "voice":
-            voice_segment = message
-
-        if voice_segment and voice_segment.data.get("requires_upload"):
-            src_name = await upload_voice(
-                self.adapter,
-                voice_segment.data.get("url"),
-                voice_segment.data.get("path"),
-                voice_segment.data.get("raw"),
-            )
-            voice_segment = MessageSegment.voice(src_name=src_name)
-
-        if voice_segment:
-            await target_method(event, voice_segment)
-        else:
+        if isinstance(message, MessageSegment):
+            message = Message(message)
+        if not isinstance(message, Message) or all(
+            segment.type != "voice" for segment in message
+        ):
             await target_method(
                 event, _format_send_message(message, at_sender, reply_message)
             )
+            return
+
+        for part in await self._split_voice_message(message, at_sender, reply_message):
+            await target_method(event, part)
+
+    async def _split_voice_message(
+        self, message: Message, at_sender: bool, reply_message: bool
+    ) -> list[Message]:
+        """
+        将含语音的消息按原顺序拆分为文本与语音两类数据包
+
+        需要上传的语音并发上传(并发数量受 `EFCHAT_HTTP_CONCURRENCY` 限制)，
+        @用户 与回复原消息添加在第一段文本前，没有文本时单独发送
+        """
+        parts: list[Message] = []
+        text = Message()
+        for segment in message:
+            if segment.type != "voice":
+                text.append(segment)
+                continue
+            if str(text).strip():
+                parts.append(text)
+            parts.append(Message(segment))
+            text = Message()
+        if str(text).strip():
+            parts.append(text)
+
+        if at_sender or reply_message:
+            index = next(
+                (i for i, part in enumerate(parts) if part[0].type != "voice"), None
+            )
+            if index is None:
+                parts.insert(0, _format_send_message("", at_sender, reply_message))
+            else:
+                parts[index] = _format_send_message(
+                    parts[index], at_sender, reply_message
+                )
+
+        uploads = [
+            part
+            for part in parts
+            if part[0].type == "voice" and part[0].data.get("requires_upload")
+        ]
+        results = await asyncio.gather(
+            *(
+                upload_voice(
+                    self.adapter,
+                    part[0].data.get("url"),
+                    part[0].data.get("path"),
+                    part[0].data.get("raw"),
+                )
+                for part in uploads
+            ),
+            return_exceptions=True,
+        )
+        for part, result in zip(uploads, results):
+            if isinstance(result, BaseException):
+                raise result
+            part[0] = MessageSegment.voice(src_name=result)
+        return parts
 
     async def send_chat_message(
         self,
@@ -108,14 +181,72 @@ class Bot(BaseBot):
         await self.call_api("move", channel=new_channel)
         self.cfg.channel = new_channel
 
-    async def change_nick(self, new_nick: str):
-        """修改机器人名称"""
-        await self.call_api("changenick", nick=new_nick)
+    async def change_nick(self, new_nick: str) -> ChangeNickEvent:
+        """修改机器人名称，等待服务器确认后返回 `ChangeNickEvent`"""
+        event = await self.call_api("changenick", nick=new_nick)
         self.cfg.nick = new_nick
+        return event
+
+    async def get_chat_history(self, num: int) -> list[ChatHistory]:
+        """获取历史聊天记录，按时间倒序排列(最新消息在前)"""
+        event: ListHistoryEvent = await self.call_api("get_old", num=num)
+        return event.text
+
+    async def query_chat_history(
+        self,
+        channel: Optional[str] = None,
+        nick: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> list[ChatHistory]:
+        """从本地聊天记录存储中分页查询，需配置 `EFCHAT_HISTORY_PATH`"""
+        if self.adapter.history is None:
+            raise ApiNotAvailable
+        return await self.adapter.history.query(
+            channel, nick, since, until, limit, offset
+        )
+
+    def get_online_users(self) -> list[OnlineUser]:
+        """获取当前房间的在线用户"""
+        return self.roster.users()
+
+    def is_online(self, nick: str) -> bool:
+        """用户是否在线"""
+        return nick in self.roster
+
+    def get_user(self, nick: str) -> Optional[OnlineUser]:
+        """按昵称获取在线用户信息"""
+        return self.roster.get(nick)
+
+    def get_user_by_id(self, userid: int) -> Optional[OnlineUser]:
+        """按用户ID获取在线用户信息"""
+        return self.roster.get_by_userid(userid)
 
-    async def get_chat_history(self, num: int):
-        """获取历史聊天记录"""
-        await self.call_api("get_old", num=num)
+    def get_users_by_trip(self, trip: str) -> list[OnlineUser]:
+        """按 trip 获取在线用户"""
+        return self.roster.get_by_trip(trip)
+
+    def get_users_by_level(self, level: int) -> list[OnlineUser]:
+        """按等级获取在线用户"""
+        return self.roster.get_by_level(level)
+
+    def is_afk(self, nick: str) -> bool:
+        """用户是否处于 AFK 状态"""
+        return self.roster.is_afk(nick)
+
+    def get_send_stats(self) -> dict[str, Any]:
+        """获取发送队列状态(排队深度、各通道深度、已发送数量、平均/最长等待时间、合并数量)"""
+        if queue := self.adapter.send_queues.get(self):
+            return queue.stats()
+        return {}
+
+    def get_heartbeat_stats(self) -> dict[str, Any]:
+        """获取心跳状态(心跳次数、空闲时间、探测往返延迟的最近/最小/最大/平均值)"""
+        if hb := self.adapter.heartbeats.get(self):
+            return hb.stats()
+        return {}
 
     async def handle_event(self, event: Event) -> None:
         """处理收到的事件"""
@@ -125,70 +256,60 @@ class Bot(BaseBot):
             and event.nick == self.cfg.nick
         ):
             if isinstance(event, MessageEvent):
-                _check_at_me(self, event)
-                _check_nickname(self, event)
+                _check_to_me(self, event)
 
             await handle_event(self, event)
         else:
             logger.debug(
-                f"EFChat {self.self_id} | 过滤自身消息: {event.get_plaintext()}"
+                lambda: f"EFChat {self.self_id} | 过滤自身消息: {event.get_plaintext()}"
             )
 
 
-def _check_at_me(bot, event: MessageEvent) -> None:
-    """检查消息开头或结尾是否存在 @机器人，去除并赋值 `event.to_me`"""
-    if not isinstance(event, MessageEvent) or not event.message:
-        return
+def _is_at_me(segment: MessageSegment, targets: frozenset[str]) -> bool:
+    return segment.type == "at" and str(segment.data.get("target", "")) in targets
 
+
+def _check_to_me(bot: "Bot", event: MessageEvent) -> None:
+    """检查消息首尾的 @机器人 与开头的昵称，去除并赋值 `event.to_me`"""
     if event.message_type == "whisper":
         event.to_me = True
         return
 
-    def _is_at_me_seg(segment: MessageSegment):
-        return segment.type == "at" and str(segment.data.get("target", "")) == str(
-            bot.self_id
-        )
+    matcher = bot.to_me_matcher
+    # 原始文本中既没有 @机器人 也不以昵称开头时无需解析消息
+    raw = event.raw_message
+    if isinstance(raw, str) and not matcher.may_match(raw):
+        return
+    message = event.message
+    if not message:
+        return
 
-    if _is_at_me_seg(event.message[0]):
+    if _is_at_me(message[0], matcher.at_targets):
         event.to_me = True
-        event.message.pop(0)
-        if event.message and event.message[0].type == "text":
-            event.message[0].data["text"] = event.message[0].data["text"].lstrip()
-            if not event.message[0].data["text"]:
-                del event.message[0]
+        message.pop(0)
+        if message and message[0].type == "text":
+            message[0].data["text"] = message[0].data["text"].lstrip()
+            if not message[0].data["text"]:
+                del message[0]
 
-    if not event.to_me:
+    if not event.to_me and message:
         i = -1
-        last_msg_seg = event.message[i]
         if (
-            last_msg_seg.type == "text"
-            and not last_msg_seg.data["text"].strip()
-            and len(event.message) >= 2
+            message[i].type == "text"
+            and not message[i].data["text"].strip()
+            and len(message) >= 2
         ):
             i -= 1
-            last_msg_seg = event.message[i]
-
-        if _is_at_me_seg(last_msg_seg):
+        if _is_at_me(message[i], matcher.at_targets):
             event.to_me = True
-            del event.message[i:]
-
-    if not event.message:
-        event.message.append(MessageSegment.text(""))
-
-
-def _check_nickname(bot: "Bot", event: MessageEvent) -> None:
-    """检查消息开头是否存在昵称，去除并赋值 `event.to_me`"""
-    first_msg_seg = event.message[0]
-    if first_msg_seg.type != "text":
-        return
+            del message[i:]
 
-    nicknames = {re.escape(bot.cfg.nick)}
-    if not nicknames:
-        return
+    if message and message[0].type == "text":
+        first_text = message[0].data["text"]
+        if m := matcher.nickname.match(first_text):
+            logger.debug(f"被用户at: {m[1]}")
+            event.to_me = True
+            message[0].data["text"] = first_text[m.end() :]
 
-    nickname_regex = "|".join(nicknames)
-    first_text = first_msg_seg.data["text"]
-    if m := re.search(rf"^({nickname_regex})([\s,，]*|$)", first_text, re.IGNORECASE):
-        logger.debug(f"被用户at: {m[1]}")
-        event.to_me = True
-        first_msg_seg.data["text"] = first_text[m.end() :]
+    if not message:
+        message.append(MessageSegment.text(""))
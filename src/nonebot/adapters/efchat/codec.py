@@ -0,0 +1,47 @@
+"""WebSocket 数据帧 JSON 编解码
+
+已安装 `orjson` 或 `msgspec` 时自动使用，否则回退到标准库 `json`。
+`loads` 可直接接受 `bytes` 数据帧，`dumps` 始终返回 `str` 以文本帧发送。
+"""
+
+import json
+from typing import Any, Callable, Union
+
+backend: str
+"""当前使用的 JSON 后端名称"""
+loads: Callable[[Union[str, bytes]], Any]
+"""解析 JSON 数据帧"""
+dumps: Callable[[Any], str]
+"""序列化为 JSON 文本"""
+DecodeError: tuple[type[Exception], ...]
+"""解析失败时可能抛出的异常类型"""
+
+try:
+    import orjson
+
+    backend = "orjson"
+    loads = orjson.loads
+    DecodeError = (orjson.JSONDecodeError,)
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+except ImportError:
+    try:
+        import msgspec
+
+        _encoder = msgspec.json.Encoder()
+        _decoder = msgspec.json.Decoder()
+
+        backend = "msgspec"
+        loads = _decoder.decode
+        DecodeError = (msgspec.DecodeError,)
+
+        def dumps(obj: Any) -> str:
+            return _encoder.encode(obj).decode()
+
+    except ImportError:
+        backend = "json"
+        loads = json.loads
+        dumps = json.dumps
+        DecodeError = (json.JSONDecodeError, UnicodeDecodeError)
@@ -1,3 +1,5 @@
+from pathlib import Path
+from typing import Optional
 from pydantic import BaseModel, Field
 from .models import EFChatBotConfig
 
@@ -6,3 +8,57 @@ class Config(BaseModel):
     efchat_bots: list[EFChatBotConfig] = Field(default_factory=list)
     """efchat配置"""
 
+    efchat_ws_url: str = "wss://efchat.irin-wakako.uk/ws"
+    """WebSocket 服务地址"""
+    efchat_voice_url: str = "https://efchat.melon.fish/voice"
+    """语音上传地址"""
+    efchat_dispatch_workers: int = 16
+    """并发处理事件的最大数量，为 0 时所有事件按接收顺序依次处理"""
+    efchat_dispatch_max_pending: int = 1000
+    """每个会话最多积压的待处理事件数量，超出时丢弃新事件，为 0 时不限制"""
+    efchat_history_path: Optional[Path] = None
+    """本地聊天记录数据库(SQLite)路径，为空时不启用"""
+    efchat_fast_decode: bool = False
+    """是否由原始数据帧直接校验为事件(需要 pydantic v2)"""
+    efchat_coalesce_window: float = 0.0
+    """合并连续房间消息的等待窗口(秒)，为 0 时不合并"""
+    efchat_coalesce_max_length: int = 2000
+    """合并后房间消息的最大长度"""
+    efchat_api_timeout: float = 10.0
+    """等待 API 回复的超时时间(秒)"""
+    efchat_voice_cache_size: int = 256
+    """语音上传缓存的最大条目数，为 0 时不启用"""
+    efchat_voice_cache_ttl: Optional[float] = None
+    """语音上传缓存的存活时间(秒)，为空时不过期"""
+    efchat_voice_cache_path: Optional[Path] = None
+    """语音上传缓存的持久化文件路径，为空时仅保存在内存中"""
+    efchat_voice_max_size: int = 20 * 1024 * 1024
+    """语音文件大小上限(字节)，上传与下载超出时立即中止"""
+    efchat_http_timeout: float = 30.0
+    """语音上传与下载请求的超时时间(秒)"""
+    efchat_http_retries: int = 2
+    """语音上传与下载遇到网络错误或 5xx 响应时的重试次数"""
+    efchat_http_concurrency: int = 4
+    """同时进行的语音上传与下载请求数量，为 0 时不限制"""
+    efchat_connect_stagger: float = 1.0
+    """多个 Bot 依次启动连接的间隔(秒)"""
+    efchat_reconnect_base: float = 1.0
+    """重连退避的初始等待时间(秒)"""
+    efchat_reconnect_max: float = 60.0
+    """重连退避的最长等待时间(秒)"""
+    efchat_heartbeat_interval: float = 30.0
+    """超过该时间(秒)未收到数据时发送心跳"""
+    efchat_heartbeat_timeout: Optional[float] = None
+    """空闲时发送探测指令，超过该时间(秒)未收到回复则判定连接失效并重连，为空时不探测"""
+    efchat_metrics: bool = False
+    """是否统计适配器指标"""
+    efchat_metrics_host: str = "127.0.0.1"
+    """指标服务监听地址"""
+    efchat_metrics_port: Optional[int] = None
+    """指标服务端口，设置后启动本地指标服务(并自动启用指标统计)"""
+    efchat_record_path: Optional[Path] = None
+    """数据帧录制文件路径，设置后将收发的原始数据帧追加写入该文件"""
+    efchat_log_frame_rate: float = 20.0
+    """逐帧日志(收到的数据、解析与处理错误)每秒最多输出的条数，为 0 时不限制"""
+    efchat_log_async: bool = False
+    """是否将 NoneBot 默认的日志输出改为由后台线程写出"""
@@ -0,0 +1,116 @@
+import re
+import asyncio
+import itertools
+from collections import deque
+from typing import Optional
+from .event import Event
+from .exception import ActionFailed
+
+REPLY_CMDS: dict[str, str] = {
+    "get_old": "list",
+    "changenick": "changenick",
+    "join": "onlineSet",
+}
+"""发出的指令与服务器回复的 `cmd` 的对应关系"""
+
+_NICK_REJECTED = re.compile(
+    r"昵称.{0,8}(已被占用|已被使用|已存在|不合法|无效|过长)"
+    r"|nick(name)?\s+(is\s+)?(already\s+)?(taken|in use|invalid)",
+    re.IGNORECASE,
+)
+
+REJECT_PATTERNS: dict[str, "re.Pattern[str]"] = {
+    "changenick": _NICK_REJECTED,
+    "onlineSet": _NICK_REJECTED,
+}
+"""服务器以 `warn` 拒绝指令(如昵称已被占用)时，各回复对应的拒绝原因；
+与之不匹配的 `warn` 视为无关的通知，不影响等待中的调用"""
+
+_REJECT_CMD = "warn"
+
+
+class ReplyWaiter:
+    """将发出的指令与服务器回复关联
+
+    同类回复按先进先出的顺序交给等待者，并发调用不会拿错回复；
+    服务器以 `warn` 拒绝指令且内容与 `REJECT_PATTERNS` 匹配时，最早登记的相应等待者以
+    `ActionFailed` 失败。
+    """
+
+    def __init__(self):
+        self._waiting: dict[str, deque[asyncio.Future]] = {}
+        self._order = itertools.count()
+        self._seq: dict[asyncio.Future, int] = {}
+        self._internal: set[asyncio.Future] = set()
+
+    def expect(self, reply_cmd: str, internal: bool = False) -> asyncio.Future:
+        """登记一个等待 `reply_cmd` 回复的 Future，`internal` 表示适配器内部的调用"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(reply_cmd, deque()).append(future)
+        self._seq[future] = next(self._order)
+        if internal:
+            self._internal.add(future)
+        return future
+
+    def discard(self, reply_cmd: str, future: asyncio.Future) -> None:
+        """取消登记(超时或发送失败时)"""
+        self._seq.pop(future, None)
+        self._internal.discard(future)
+        if (queue := self._waiting.get(reply_cmd)) and future in queue:
+            queue.remove(future)
+
+    def pending(self, cmd: str) -> bool:
+        """是否有调用在等待 `cmd` 回复，或可能被 `cmd` 拒绝"""
+        return bool(self._waiting.get(cmd)) or (
+            cmd == _REJECT_CMD
+            and any(self._waiting.get(reply_cmd) for reply_cmd in REJECT_PATTERNS)
+        )
+
+    def internal(self, cmd: str) -> bool:
+        """`cmd` 回复是否将交给适配器内部的调用(如心跳探测)，此时回复无需分发"""
+        return bool(queue := self._waiting.get(cmd)) and queue[0] in self._internal
+
+    def _pop(self, reply_cmd: str) -> Optional[asyncio.Future]:
+        queue = self._waiting.get(reply_cmd)
+        while queue:
+            future = queue.popleft()
+            self._seq.pop(future, None)
+            self._internal.discard(future)
+            if not future.done():
+                return future
+        return None
+
+    def resolve(self, event: Event) -> bool:
+        """将事件交给最早登记的等待者，返回是否有等待者"""
+        if future := self._pop(event.cmd):
+            future.set_result(event)
+            return True
+        return self._reject(event)
+
+    def _reject(self, event: Event) -> bool:
+        """`event` 为拒绝回复时，使最早登记的可被拒绝的等待者失败"""
+        text = getattr(event, "text", None)
+        if event.cmd != _REJECT_CMD or not isinstance(text, str):
+            return False
+        candidates = [
+            (self._seq.get(queue[0], 0), reply_cmd)
+            for reply_cmd, pattern in REJECT_PATTERNS.items()
+            if (queue := self._waiting.get(reply_cmd)) and pattern.search(text)
+        ]
+        if not candidates:
+            return False
+        future = self._pop(min(candidates)[1])
+        if future is None:
+            return False
+        future.set_exception(ActionFailed(message=text))
+        return True
+
+    def fail_all(self, exc: Exception) -> None:
+        """使所有等待者失败"""
+        for queue in self._waiting.values():
+            while queue:
+                future = queue.popleft()
+                if not future.done():
+                    future.set_exception(exc)
+        self._seq.clear()
+        self._internal.clear()
@@ -0,0 +1,100 @@
+import re
+from functools import lru_cache
+from typing import Any, Optional, Union
+from nonebot.compat import PYDANTIC_V2, type_validate_python
+from .event import (
+    EVENT_CLASSES,
+    Event,
+    MessageEvent,
+    ChannelMessageEvent,
+    WhisperMessageEvent,
+)
+from . import codec
+
+if PYDANTIC_V2:
+    from pydantic import TypeAdapter
+
+# 字符串中的引号都会被转义，因此未被转义的 "cmd" 只可能是键名
+_CMD = r'(?<!\\)"cmd"\s*:\s*"([^"\\]*)"'
+_WHISPER = r'(?<!\\)"type"\s*:\s*"whisper"'
+_FROM = r'(?<!\\)"from"\s*:\s*[^\sn]'  # 值不为 null
+
+_STRING = r'(?<!\\)"{key}"\s*:\s*"((?:[^"\\]|\\.)*)"'
+
+_PATTERNS = {
+    str: tuple(re.compile(p) for p in (_CMD, _WHISPER, _FROM)),
+    bytes: tuple(re.compile(p.encode()) for p in (_CMD, _WHISPER, _FROM)),
+}
+
+
+class EventDecoder:
+    """事件解码器
+
+    每个事件类型的校验器只在创建时编译一次；pydantic v2 下还可以跳过中间的 dict，
+    由原始数据帧直接校验为事件(`validate_json`)。pydantic v1 下退回到普通的解析路径。
+    """
+
+    def __init__(self):
+        classes = {*EVENT_CLASSES.values(), ChannelMessageEvent, WhisperMessageEvent}
+        self._adapters: dict[type[Event], Any] = (
+            {cls: TypeAdapter(cls) for cls in classes} if PYDANTIC_V2 else {}
+        )
+
+    @property
+    def supports_json(self) -> bool:
+        """是否支持由原始数据帧直接校验"""
+        return PYDANTIC_V2
+
+    def validate_python(self, event_class: type[Event], data: dict[str, Any]) -> Event:
+        """由 dict 校验为事件"""
+        if adapter := self._adapters.get(event_class):
+            return adapter.validate_python(data)
+        return type_validate_python(event_class, data)
+
+    def validate_json(self, event_class: type[Event], raw: Union[str, bytes]) -> Event:
+        """由原始数据帧校验为事件"""
+        if adapter := self._adapters.get(event_class):
+            return adapter.validate_json(raw)
+        return type_validate_python(event_class, codec.loads(raw))
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _string_re(key: str, binary: bool) -> "re.Pattern":
+        pattern = _STRING.format(key=re.escape(key))
+        return re.compile(pattern.encode() if binary else pattern)
+
+    @classmethod
+    def peek_string(cls, raw: Union[str, bytes], key: str) -> Optional[str]:
+        """不解析整个数据帧，提取顶层字符串字段 `key` 的值，不存在时返回 `None`"""
+        binary = isinstance(raw, bytes)
+        if (m := cls._string_re(key, binary).search(raw)) is None:  # type: ignore
+            return None
+        value = m[1].decode() if binary else m[1]
+        # 含转义字符时交给 JSON 解析
+        return codec.loads(f'"{value}"') if "\\" in value else value
+
+    @staticmethod
+    def peek(raw: Union[str, bytes]) -> Optional[tuple[str, type[Event]]]:
+        """
+        不解析整个数据帧，仅提取 `cmd` 并确定事件类型
+
+        无法确定或不支持的 `cmd` 返回 `None`，应交由普通的解析路径处理
+        """
+        cmd_re, whisper_re, from_re = _PATTERNS[type(raw)]
+        if (m := cmd_re.search(raw)) is None:  # type: ignore[arg-type]
+            return None
+        cmd = m[1].decode() if isinstance(raw, bytes) else m[1]
+        if (event_class := EVENT_CLASSES.get(cmd)) is None:
+            return None
+        if event_class is MessageEvent:
+            # 与 MessageEvent.get_event_class 的判断一致
+            whisper = b"whisper" if isinstance(raw, bytes) else "whisper"
+            if (
+                whisper in raw  # type: ignore[operator]
+                and whisper_re.search(raw)  # type: ignore[arg-type]
+                and from_re.search(raw)  # type: ignore[arg-type]
+            ):
+                event_class = WhisperMessageEvent
+            else:
+                event_class = ChannelMessageEvent
+        return cmd, event_class
@@ -0,0 +1,65 @@
+import asyncio
+from collections import deque
+from typing import Callable, Awaitable, Optional
+from .utils import logger
+
+
+class Dispatcher:
+    """并发事件分发器
+
+    不同会话的事件由最多 `workers` 个处理并发执行，
+    同一会话的事件严格按接收顺序依次处理；
+    每个会话最多积压 `max_pending` 个事件(为 0 时不限制)，超出的事件被丢弃。
+    """
+
+    def __init__(self, workers: int, max_pending: int = 0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.dropped = 0
+        """因会话积压过多而被丢弃的事件数量"""
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._sessions: dict[str, deque[Callable[[], Awaitable[None]]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """尚未处理完成的事件数量"""
+        return sum(len(queue) for queue in self._sessions.values())
+
+    def submit(self, key: str, handler: Callable[[], Awaitable[None]]) -> bool:
+        """提交事件处理，不会阻塞调用方；会话积压已满时丢弃并返回 `False`"""
+        if self._semaphore is None:
+            # 在事件循环内创建，避免绑定到其他事件循环
+            self._semaphore = asyncio.Semaphore(self.workers)
+        if (queue := self._sessions.get(key)) is not None:
+            if 0 < self.max_pending <= len(queue):
+                self.dropped += 1
+                return False
+            queue.append(handler)
+            return True
+        self._sessions[key] = deque((handler,))
+        task = asyncio.create_task(self._run(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, key: str) -> None:
+        queue = self._sessions[key]
+        assert self._semaphore is not None
+        try:
+            while queue:
+                async with self._semaphore:
+                    try:
+                        await queue[0]()
+                    except Exception as e:
+                        logger.error(f"事件处理错误: {type(e)}: {e}")
+                queue.popleft()
+        finally:
+            self._sessions.pop(key, None)
+
+    async def shutdown(self) -> None:
+        """取消所有尚未完成的事件处理"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._sessions.clear()
@@ -1,6 +1,6 @@
-from typing import TYPE_CHECKING, ClassVar, Literal, TypeVar
-from copy import deepcopy
+from typing import TYPE_CHECKING, Any, ClassVar, Literal, Optional, TypeVar
 from datetime import datetime
+from pydantic import PrivateAttr
 from nonebot.adapters import Event as BaseEvent
 from nonebot.compat import model_dump, model_validator, PYDANTIC_V2, ConfigDict
 from nonebot.compat import type_validate_python
@@ -102,9 +102,10 @@ class MessageEvent(Event):
     """加密身份标识"""
     message_type: ClassVar[Literal["channel", "whisper", "html"]]
 
+    _message: Optional[Message] = PrivateAttr(default=None)
+    _original_message: Optional[Message] = PrivateAttr(default=None)
+
     if TYPE_CHECKING:
-        message: Message
-        original_message: Message
         message_id: None = None
         """消息ID"""
         reply: None = None
@@ -112,12 +113,52 @@ class MessageEvent(Event):
 
     @model_validator(mode="before")
     def handle_message(cls, values):
-        if isinstance(values, dict):
-            segments = values.get("msg") if "msg" in values else values.get("text")
-            values["message"] = Message(segments)
-            values["original_message"] = deepcopy(values["message"])
+        if isinstance(values, dict) and "message" in values:
+            # 兼容直接传入 message 构造事件
+            values.setdefault("msg", values.pop("message"))
+            values.pop("original_message", None)
         return values
 
+    if not PYDANTIC_V2:
+
+        def __setattr__(self, name: str, value: Any) -> None:
+            if name in ("message", "original_message"):
+                object.__setattr__(self, name, value)
+            else:
+                super().__setattr__(name, value)
+
+    @property
+    def raw_message(self) -> Any:
+        """未解析的原始消息内容"""
+        msg = getattr(self, "msg", None)
+        return getattr(self, "text", None) if msg is None else msg
+
+    @property
+    def message(self) -> Message:
+        """消息内容，首次访问时才解析"""
+        if self._message is None:
+            self._message = Message(self.raw_message)
+        return self._message
+
+    @message.setter
+    def message(self, value: Message) -> None:
+        self._message = value
+
+    @property
+    def original_message(self) -> Message:
+        """原始消息内容
+
+        与 `message` 共享同一份不可变的原始文本，首次访问时单独解析，
+        因此 `message` 被修改后也不会影响它，且无需深拷贝
+        """
+        if self._original_message is None:
+            self._original_message = Message(self.raw_message)
+        return self._original_message
+
+    @original_message.setter
+    def original_message(self, value: Message) -> None:
+        self._original_message = value
+
     def get_event_name(self) -> str:
         return f"{self.event_type}.{self.message_type}"
 
@@ -127,12 +168,15 @@ class MessageEvent(Event):
     def get_user_id(self) -> str:
         return self.nick
 
-    def convert(self, data: dict) -> "MessageEvent":
+    @staticmethod
+    def get_event_class(data: dict) -> type["MessageEvent"]:
+        """根据原始数据的 `type`/`from` 字段确定最终的消息事件类型"""
         if data.get("type") == "whisper" and data.get("from") is not None:
-            cls = WhisperMessageEvent
-        else:
-            cls = ChannelMessageEvent
-        return type_validate_python(cls, model_dump(self))
+            return WhisperMessageEvent
+        return ChannelMessageEvent
+
+    def convert(self, data: dict) -> "MessageEvent":
+        return type_validate_python(self.get_event_class(data), model_dump(self))
 
 
 class ChannelMessageEvent(MessageEvent):
@@ -152,6 +196,7 @@ class ChannelMessageEvent(MessageEvent):
 
     @model_validator(mode="before")
     def handle_message(cls, values):
+        values = super().handle_message(values)
         if isinstance(values, dict):
             level = values["level"]
             values["role"] = LEVEL_MAP[level]
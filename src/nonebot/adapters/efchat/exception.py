@@ -26,11 +26,18 @@ class NetworkError(BaseNetworkError, EFChatAdapterException):
 
 
 class ActionFailed(BaseActionFailed, EFChatAdapterException):
-    def __init__(self, response: Response):
-        self.status_code: int = response.status_code
-        self.code: Optional[int] = response.status_code
-        self.message: Optional[Union[str, bytes]] = response.content
+    def __init__(
+        self, response: Optional[Response] = None, message: Optional[str] = None
+    ):
+        """HTTP 请求失败时传入 `response`，指令被服务器拒绝时传入拒绝原因 `message`"""
+        self.status_code: Optional[int] = None
+        self.code: Optional[int] = None
+        self.message: Optional[Union[str, bytes]] = message
         self.data: Optional[dict] = None
+        if response is None:
+            return
+        self.status_code = self.code = response.status_code
+        self.message = response.content
         with contextlib.suppress(Exception):
             if self.message:
                 self.data: Optional[dict] = json.loads(self.message)
@@ -0,0 +1,95 @@
+import time
+import asyncio
+from typing import Any, Callable, Awaitable, Optional
+from .exception import ActionFailed
+from .utils import logger
+
+
+class Heartbeat:
+    """自适应心跳
+
+    仅在超过 `interval` 秒没有收到任何数据帧时才发送 `ping`。
+    服务器不会回复 `ping`，因此设置了 `timeout` 时，空闲时还会发送一个有确定回复的探测指令，
+    以探测的往返时间作为延迟(RTT)，超过 `timeout` 秒没有收到探测回复则判定连接已失效；
+    房间安静时不会因为没有数据帧而误判。
+    """
+
+    def __init__(self, interval: float = 30, timeout: Optional[float] = None):
+        self.interval = interval
+        self.timeout = timeout
+        self.last_recv = time.monotonic()
+        """最后一次收到数据帧的时间"""
+        self.pings = 0
+        """已发送的心跳数量"""
+        self.rtt: Optional[float] = None
+        """最近一次往返延迟(秒)"""
+        self.rtt_min: Optional[float] = None
+        self.rtt_max: Optional[float] = None
+        self.rtt_avg: Optional[float] = None
+        """往返延迟的指数加权平均值(秒)"""
+
+    def on_frame(self) -> None:
+        """收到数据帧时调用"""
+        self.last_recv = time.monotonic()
+
+    def _on_rtt(self, rtt: float) -> None:
+        self.rtt = rtt
+        self.rtt_min = rtt if self.rtt_min is None else min(self.rtt_min, rtt)
+        self.rtt_max = rtt if self.rtt_max is None else max(self.rtt_max, rtt)
+        self.rtt_avg = rtt if self.rtt_avg is None else self.rtt_avg * 0.8 + rtt * 0.2
+
+    def idle(self) -> float:
+        """距离最后一次收到数据帧的秒数"""
+        return time.monotonic() - self.last_recv
+
+    def stats(self) -> dict[str, Any]:
+        """心跳与延迟统计"""
+        return {
+            "pings": self.pings,
+            "idle": self.idle(),
+            "rtt": self.rtt,
+            "rtt_min": self.rtt_min,
+            "rtt_max": self.rtt_max,
+            "rtt_avg": self.rtt_avg,
+        }
+
+    async def _probe(self, probe: Callable[[], Awaitable[Any]]) -> bool:
+        """发送探测指令并等待回复，返回连接是否存活"""
+        assert self.timeout is not None
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(probe(), self.timeout)
+        except ActionFailed:
+            # 指令被拒绝同样说明服务器有回复
+            pass
+        except asyncio.TimeoutError:
+            logger.warning(f"超过 {self.timeout:.0f} 秒未收到探测回复，连接可能已失效")
+            return False
+        except Exception as e:
+            logger.error(f"心跳探测失败: {e}")
+            return False
+        self._on_rtt(time.monotonic() - start)
+        return True
+
+    async def run(
+        self,
+        send_ping: Callable[[], Awaitable[None]],
+        probe: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> None:
+        """心跳循环，连接失效时返回"""
+        while True:
+            wait = self.interval - self.idle()
+            if wait > 0:
+                # 近期有数据往来时无需发送心跳
+                await asyncio.sleep(wait)
+                continue
+            try:
+                await send_ping()
+            except Exception as e:
+                logger.error(f"心跳包发送失败: {e}")
+                return
+            self.pings += 1
+            if self.timeout is not None and probe is not None:
+                if not await self._probe(probe):
+                    return
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,247 @@
+import asyncio
+import sqlite3
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional, Union
+from .models import ChatHistory
+from .event import Event, ChannelMessageEvent, ListHistoryEvent
+from .utils import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    msg_id INTEGER UNIQUE,
+    channel TEXT NOT NULL,
+    nick TEXT NOT NULL,
+    trip TEXT NOT NULL DEFAULT '',
+    content TEXT NOT NULL,
+    time TEXT NOT NULL,
+    ts REAL,
+    show INTEGER NOT NULL DEFAULT 1,
+    head TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_messages_channel_ts ON messages (channel, ts);
+CREATE INDEX IF NOT EXISTS idx_messages_nick_ts ON messages (nick, ts);
+CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages (ts);
+"""
+
+# 实时消息没有消息ID，以 (房间, 昵称, 时间戳, 内容) 去重
+_LIVE_INDEX = "idx_messages_live"
+_CREATE_LIVE_INDEX = f"""
+DELETE FROM messages WHERE msg_id IS NULL AND rowid NOT IN (
+    SELECT MIN(rowid) FROM messages WHERE msg_id IS NULL
+    GROUP BY channel, nick, ts, content
+);
+CREATE UNIQUE INDEX {_LIVE_INDEX} ON messages (channel, nick, ts, content)
+WHERE msg_id IS NULL;
+"""
+
+_INSERT = (
+    "INSERT OR IGNORE INTO messages "
+    "(msg_id, channel, nick, trip, content, time, ts, show, head) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# 历史消息与实时消息的时间精度可能不同，时间戳相差不超过该值(秒)视为同一条消息
+_TS_TOLERANCE = 1.0
+
+_SAME_MESSAGE = (
+    "channel = :channel AND nick = :nick AND content = :content "
+    "AND ts BETWEEN :ts - :tolerance AND :ts + :tolerance"
+)
+
+# 已有同一条历史消息时跳过实时消息
+_INSERT_LIVE = (
+    "INSERT OR IGNORE INTO messages "
+    "(msg_id, channel, nick, trip, content, time, ts, show, head) "
+    "SELECT NULL, :channel, :nick, :trip, :content, :time, :ts, :show, :head "
+    "WHERE NOT EXISTS (SELECT 1 FROM messages WHERE msg_id IS NOT NULL AND "
+    f"{_SAME_MESSAGE})"
+)
+
+# 先前以实时消息保存(无消息ID)的记录，在收到历史消息时补充消息ID
+_FILL_ID = (
+    "UPDATE OR IGNORE messages SET msg_id = :msg_id WHERE rowid = ("
+    f"SELECT rowid FROM messages WHERE msg_id IS NULL AND {_SAME_MESSAGE} LIMIT 1)"
+)
+
+_FIELDS = ("msg_id", "channel", "nick", "trip", "content", "time", "ts", "show", "head")
+
+_Row = tuple[Optional[int], str, str, str, str, str, Optional[float], int, str]
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """将时间转换为秒级时间戳，无法识别时返回 `None`"""
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            try:
+                return datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                return None
+    if isinstance(value, (int, float)):
+        # 毫秒级时间戳
+        return value / 1000 if value > 1e11 else float(value)
+    return None
+
+
+class HistoryStore:
+    """本地聊天记录存储(SQLite)
+
+    记录 `ListHistoryEvent` 中的历史消息与实时的 `ChannelMessageEvent`，
+    历史消息以消息ID去重，没有消息ID的实时消息以 (房间, 昵称, 时间戳, 内容) 去重，
+    并按房间、昵称与时间建立索引。
+    所有数据库操作都在独立线程中执行，不会阻塞事件循环。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="efchat-history"
+        )
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+            if not self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+                (_LIVE_INDEX,),
+            ).fetchone():
+                # 旧版本的数据库中可能已有重复的实时消息，建立唯一索引前先清理
+                self._conn.executescript(_CREATE_LIVE_INDEX)
+        return self._conn
+
+    def _insert(self, rows: list[_Row]) -> None:
+        conn = self._connection()
+        params = [
+            {**dict(zip(_FIELDS, row)), "tolerance": _TS_TOLERANCE} for row in rows
+        ]
+        with conn:
+            for row, param in zip(rows, params):
+                if row[0] is None:
+                    conn.execute(_INSERT_LIVE, param)
+                else:
+                    conn.execute(_FILL_ID, param)
+                    conn.execute(_INSERT, row)
+
+    def _select(self, sql: str, params: list[Any]) -> list[tuple]:
+        return self._connection().execute(sql, params).fetchall()
+
+    @staticmethod
+    def _log_error(future: Future) -> None:
+        if e := future.exception():
+            logger.error(f"聊天记录写入失败: {type(e)}: {e}")
+
+    def record(self, event: Event, channel: str) -> None:
+        """记录事件中的消息，写入在后台线程中完成，不等待结果"""
+        if isinstance(event, ListHistoryEvent):
+            rows: list[_Row] = [
+                (
+                    item.id,
+                    item.channel,
+                    item.nick,
+                    item.trip,
+                    item.content,
+                    item.time,
+                    _timestamp(item.time),
+                    item.show,
+                    item.head,
+                )
+                for item in event.text
+            ]
+        elif isinstance(event, ChannelMessageEvent):
+            raw = event.raw_message
+            rows = [
+                (
+                    getattr(event, "id", None),
+                    event.channel or channel,
+                    event.nick,
+                    event.trip,
+                    raw if isinstance(raw, str) else str(event.original_message),
+                    str(event.time),
+                    _timestamp(event.time),
+                    1,
+                    event.head,
+                )
+            ]
+        else:
+            return
+        if rows:
+            self._executor.submit(self._insert, rows).add_done_callback(
+                self._log_error
+            )
+
+    async def query(
+        self,
+        channel: Optional[str] = None,
+        nick: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> list[ChatHistory]:
+        """
+        查询聊天记录，按时间倒序排列(最新消息在前)
+
+        Args:
+        - channel (str): 房间名称
+        - nick (str): 用户名称
+        - since (float): 起始时间戳(秒，包含)
+        - until (float): 截止时间戳(秒，不包含)
+        - limit (int): 每页数量
+        - offset (int): 跳过的数量
+        """
+        clauses, params = [], []
+        if channel is not None:
+            clauses.append("channel = ?")
+            params.append(channel)
+        if nick is not None:
+            clauses.append("nick = ?")
+            params.append(nick)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        sql = (
+            "SELECT msg_id, channel, nick, content, time, show, head, trip "
+            "FROM messages"
+        )
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts DESC, rowid DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+        rows = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._select, sql, params
+        )
+        return [
+            ChatHistory(
+                id=row[0] or 0,
+                channel=row[1],
+                nick=row[2],
+                content=row[3],
+                time=row[4],
+                show=row[5],
+                head=row[6],
+                trip=row[7],
+            )
+            for row in rows
+        ]
+
+    async def close(self) -> None:
+        """等待写入完成并关闭数据库"""
+
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, _close)
+        self._executor.shutdown(wait=False)
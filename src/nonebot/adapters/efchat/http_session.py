@@ -0,0 +1,138 @@
+import asyncio
+from typing import Any, AsyncGenerator, Optional
+from nonebot.drivers import HTTPClientMixin, HTTPClientSession, Request, Response
+from .utils import logger
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36 Edg/91.0.864.59",
+    "Origin": "https://efchat.melon.fish",
+    "Referer": "https://efchat.melon.fish/",
+}
+"""语音上传与下载请求的公共请求头"""
+
+
+class HTTPSession:
+    """长连接 HTTP 会话
+
+    通过驱动器的会话接口复用连接(keep-alive)，首次请求时创建；
+    同时进行的请求数量受 `concurrency` 限制，网络错误与 5xx 响应按指数退避重试。
+    """
+
+    def __init__(
+        self,
+        driver: HTTPClientMixin,
+        timeout: float = 30.0,
+        retries: int = 2,
+        concurrency: int = 4,
+        retry_delay: float = 0.5,
+    ):
+        self.driver = driver
+        self.timeout = timeout
+        self.retries = max(retries, 0)
+        self.concurrency = concurrency
+        self.retry_delay = retry_delay
+        self._session: Optional[HTTPClientSession] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _get_session(self) -> HTTPClientSession:
+        if self._lock is None:
+            # 在事件循环内创建，避免绑定到其他事件循环
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._session is None:
+                session = self.driver.get_session(headers=HEADERS, timeout=self.timeout)
+                await session.setup()
+                self._session = session
+            return self._session
+
+    def _limit(self) -> Any:
+        if self.concurrency <= 0:
+            return _NoLimit()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    @staticmethod
+    def _positions(request: Request) -> list[tuple[Any, int]]:
+        """记录上传文件对象的当前位置，重试前据此回退"""
+        return [
+            (content, content.tell())
+            for _, (_, content, _) in request.files or ()
+            if hasattr(content, "seek")
+        ]
+
+    async def _retry(self, attempt: int, request: Request, reason: Any) -> None:
+        delay = self.retry_delay * 2**attempt
+        logger.warning(
+            f"{request.method} {request.url} 失败({reason})，{delay:.1f}s 后重试"
+        )
+        await asyncio.sleep(delay)
+
+    async def request(self, request: Request) -> Response:
+        """发送请求，重试次数用尽后返回最后一次的响应或抛出最后一次的异常"""
+        positions = self._positions(request)
+        async with self._limit():
+            session = await self._get_session()
+            for attempt in range(self.retries + 1):
+                for content, pos in positions:
+                    content.seek(pos)
+                try:
+                    response = await session.request(request)
+                except Exception as e:
+                    if attempt >= self.retries:
+                        raise
+                    await self._retry(attempt, request, e)
+                    continue
+                if response.status_code < 500 or attempt >= self.retries:
+                    return response
+                await self._retry(attempt, request, response.status_code)
+        raise RuntimeError("unreachable")
+
+    async def stream_request(
+        self, request: Request, *, chunk_size: int = 1024
+    ) -> AsyncGenerator[Response, None]:
+        """
+        分块发送请求，仅在收到第一块数据之前重试
+
+        提前结束迭代时应调用 `aclose()`，以便及时释放连接与并发名额
+        """
+        async with self._limit():
+            session = await self._get_session()
+            for attempt in range(self.retries + 1):
+                started = False
+                stream = session.stream_request(request, chunk_size=chunk_size)
+                try:
+                    async for response in stream:
+                        if (
+                            not started
+                            and response.status_code >= 500
+                            and attempt < self.retries
+                        ):
+                            break
+                        started = True
+                        yield response
+                    else:
+                        return
+                except Exception as e:
+                    if started or attempt >= self.retries:
+                        raise
+                    await self._retry(attempt, request, e)
+                    continue
+                finally:
+                    await stream.aclose()  # type: ignore[attr-defined]
+                await self._retry(attempt, request, response.status_code)
+
+    async def close(self) -> None:
+        """关闭会话，之后的请求会重新创建会话"""
+        if self._session is not None:
+            session, self._session = self._session, None
+            await session.close()
+
+
+class _NoLimit:
+    async def __aenter__(self) -> None:
+        pass
+
+    async def __aexit__(self, *args) -> None:
+        pass
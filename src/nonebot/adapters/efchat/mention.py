@@ -0,0 +1,32 @@
+import re
+from typing import Iterable
+
+_NEVER = re.compile(r"(?!)")
+
+
+class MentionMatcher:
+    """判断消息是否提及机器人
+
+    所有昵称与别名预先编译为一个按长度降序排列的分支正则，
+    较长的别名优先匹配；`at_targets` 为 @ 时视为机器人本身的名称。
+    """
+
+    def __init__(self, nicknames: Iterable[str], at_targets: Iterable[str]):
+        names = sorted({name for name in nicknames if name}, key=len, reverse=True)
+        self.at_targets = frozenset(target for target in at_targets if target)
+        """@ 时视为机器人本身的名称"""
+        self._at_needles = tuple(f"@{target}" for target in self.at_targets)
+        alternation = "|".join(map(re.escape, names))
+        self.nickname = (
+            re.compile(rf"^({alternation})([\s,，]*|$)", re.IGNORECASE)
+            if names
+            else _NEVER
+        )
+        """匹配开头昵称的正则，第 1 组为匹配到的昵称"""
+
+    def may_match(self, raw: str) -> bool:
+        """原始文本是否可能提及机器人，为 `False` 时无需解析消息"""
+        return (
+            any(needle in raw for needle in self._at_needles)
+            or self.nickname.match(raw) is not None
+        )
@@ -1,16 +1,91 @@
+import os
 import base64
+import asyncio
+import hashlib
 import filetype
+import threading
 from nonebot.adapters import (
     MessageSegment as BaseMessageSegment,
     Message as BaseMessage,
 )
-from typing import Type, Union, Optional
+from typing import Callable, Type, Union, Optional
 from typing_extensions import Self
+from collections import OrderedDict
 from collections.abc import Iterable
 from pathlib import Path
 import re
 
 _VOICE_URL_RE = re.compile(r"https://efchat\.melon\.fish/oss/(.+)")
+# image: ![image](url) 可出现在任意位置
+# voice: USERSENDVOICE_static/xxx，位于开头或空白之后，直到空白或末尾
+# at: @nick，位于开头或空白之后，直到空白或末尾
+_SEGMENT_RE = re.compile(
+    r"!\[[^\]]*\]\((?P<image>[^)]+)\)"
+    r"|(?<!\S)(?P<voice>USERSENDVOICE_\S+)"
+    r"|(?<!\S)@(?P<at>\S+)"
+)
+
+
+_IMAGE_CACHE_SIZE = 128
+"""图片 data URL 缓存的最大条目数"""
+_IMAGE_CACHE_BYTES = 16 * 1024 * 1024
+"""图片 data URL 缓存的总大小上限(字符数)"""
+_IMAGE_CACHE_ENTRY_BYTES = 1024 * 1024
+"""超过该大小(字符数)的 data URL 不缓存"""
+_image_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_image_cache_bytes = 0
+_image_cache_lock = threading.Lock()
+
+
+def _cached_data_url(key: tuple, build: Callable[[], str]) -> str:
+    """从 LRU 缓存中读取 data URL，未命中时构建并写入"""
+    global _image_cache_bytes
+    with _image_cache_lock:
+        if (data_url := _image_cache.get(key)) is not None:
+            _image_cache.move_to_end(key)
+            return data_url
+    data_url = build()
+    if len(data_url) > _IMAGE_CACHE_ENTRY_BYTES:
+        return data_url
+    with _image_cache_lock:
+        if (old := _image_cache.pop(key, None)) is not None:
+            _image_cache_bytes -= len(old)
+        _image_cache[key] = data_url
+        _image_cache_bytes += len(data_url)
+        while (
+            len(_image_cache) > _IMAGE_CACHE_SIZE
+            or _image_cache_bytes > _IMAGE_CACHE_BYTES
+        ):
+            _image_cache_bytes -= len(_image_cache.popitem(last=False)[1])
+    return data_url
+
+
+def _encode_image(raw: bytes) -> str:
+    mime_type = filetype.guess_mime(raw) or "image/png"
+    return MessageSegment._create_data_url(raw, mime_type)
+
+
+def _raw_data_url(raw: bytes) -> str:
+    """图片数据的 data URL，以内容哈希缓存"""
+    return _cached_data_url(
+        ("raw", hashlib.sha1(raw).digest()), lambda: _encode_image(raw)
+    )
+
+
+def _path_data_url(path: Union[str, Path]) -> str:
+    """图片文件的 data URL，以路径、修改时间与大小缓存"""
+
+    def _build() -> str:
+        with open(path, "rb") as f:
+            return _encode_image(f.read())
+
+    try:
+        st = os.stat(path)
+        return _cached_data_url(
+            ("path", os.path.abspath(path), st.st_mtime_ns, st.st_size), _build
+        )
+    except (IOError, OSError) as e:
+        raise ValueError(f"无法读取文件 {path}: {str(e)}") from e
 
 
 class MessageSegment(BaseMessageSegment["Message"]):
@@ -30,19 +105,30 @@ class MessageSegment(BaseMessageSegment["Message"]):
             return Image("image", {"url": url})
 
         if raw is not None:
-            mime_type = filetype.guess_mime(raw) or "image/png"
-            data_url = MessageSegment._create_data_url(raw, mime_type)
-            return Image("image", {"url": data_url})
+            return Image("image", {"url": _raw_data_url(raw)})
 
         if path:
-            try:
-                with open(path, "rb") as f:
-                    raw = f.read()
-                mime_type = filetype.guess_mime(raw) or "image/png"
-                data_url = MessageSegment._create_data_url(raw, mime_type)
-                return Image("image", {"url": data_url})
-            except (IOError, OSError) as e:
-                raise ValueError(f"无法读取文件 {path}: {str(e)}") from e
+            return Image("image", {"url": _path_data_url(path)})
+
+        raise ValueError("Must provide at least one of url, raw, or path")
+
+    @staticmethod
+    async def image_async(
+        url: Optional[str] = None,
+        raw: Optional[bytes] = None,
+        path: Optional[Union[str, Path]] = None,
+    ) -> "Image":
+        """与 `image` 相同，但文件读取与 base64 编码在线程池中执行，不阻塞事件循环"""
+        if url:
+            return Image("image", {"url": url})
+
+        if raw is not None:
+            return Image("image", {"url": await asyncio.to_thread(_raw_data_url, raw)})
+
+        if path:
+            return Image(
+                "image", {"url": await asyncio.to_thread(_path_data_url, path)}
+            )
 
         raise ValueError("Must provide at least one of url, raw, or path")
 
@@ -161,13 +247,6 @@ class At(MessageSegment):
 class Message(BaseMessage[MessageSegment]):
     """消息类，继承 BaseMessage 并扩展文本解析和合并"""
 
-    _PARSE_RULES = [
-        # (predicate, handler)
-        (lambda txt: txt.startswith("!["), lambda txt: _parse_image(txt)),
-        (lambda txt: txt.startswith("USERSENDVOICE_"), lambda txt: _parse_voice(txt)),
-        (lambda txt: txt.startswith("@"), lambda txt: _parse_at(txt)),
-    ]
-
     @classmethod
     def get_segment_class(cls) -> Type[MessageSegment]:
         return MessageSegment
@@ -209,46 +288,20 @@ class Message(BaseMessage[MessageSegment]):
 
     @staticmethod
     def _construct(msg: str) -> Iterable[MessageSegment]:
-        segs, i = [], 0
-        while i < len(msg):
-            for pred, handler in Message._PARSE_RULES:
-                tail = msg[i:]
-                if pred(tail):
-                    seg, inc = handler(tail)
-                    segs.append(seg)
-                    i += inc
-                    break
+        """单次扫描解析消息文本中任意位置的图片、语音与 @ 消息段"""
+        segs, pos = [], 0
+        for m in _SEGMENT_RE.finditer(msg):
+            if m.start() > pos:
+                segs.append(MessageSegment.text(msg[pos : m.start()]))
+            kind = m.lastgroup
+            if kind == "image":
+                segs.append(MessageSegment.image(m["image"]))
+            elif kind == "voice":
+                src = m["voice"].replace("static/", "")
+                segs.append(MessageSegment.voice(src_name=src))
             else:
-                segs.append(MessageSegment.text(msg[i:]))
-                break
+                segs.append(MessageSegment.at(m["at"]))
+            pos = m.end()
+        if pos < len(msg):
+            segs.append(MessageSegment.text(msg[pos:]))
         return segs
-
-
-# voice: 格式 USERSENDVOICE_static/xxx
-def _parse_voice(txt: str) -> tuple[MessageSegment, int]:
-    end = txt.find(" ") if " " in txt else len(txt)
-    src = txt[:end].replace("static/", "")
-    return MessageSegment.voice(src_name=src), end
-
-
-# image: 格式 ![image](url)
-def _parse_image(txt: str) -> tuple[MessageSegment, int]:
-    # 找到第一个 '(' 和对应的 ')'
-    start = txt.find("(")
-    end = txt.find(")", start + 1)
-    if start == -1 or end == -1:
-        # 解析失败，fallback 到 text
-        return MessageSegment.text(txt), len(txt)
-    url = txt[start + 1 : end]
-    seg = MessageSegment.image(url)
-    # consumed = '![image]('  + url + ')'
-    return seg, end + 1
-
-
-# at: 以 '@' 开头，直到空格或字符串末尾
-def _parse_at(txt: str) -> tuple[MessageSegment, int]:
-    # 如果有空格，就取第一个空格前的所有字符，否则取整条
-    end = txt.find(" ") if " " in txt else len(txt)
-    target = txt[1:end]
-    seg = MessageSegment.at(target)
-    return seg, end
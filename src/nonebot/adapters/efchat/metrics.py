@@ -0,0 +1,143 @@
+import asyncio
+import bisect
+from typing import Callable, Optional
+from .utils import logger
+
+Labels = tuple[tuple[str, str], ...]
+
+_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+"""直方图的分桶上界(秒)"""
+
+METRICS: dict[str, tuple[str, str]] = {
+    "efchat_frames_received_total": ("counter", "按 cmd 统计收到的数据帧数量"),
+    "efchat_frames_sent_total": ("counter", "按 cmd 统计发送的数据帧数量"),
+    "efchat_json_decode_seconds": ("histogram", "数据帧 JSON 解析耗时"),
+    "efchat_event_validate_seconds": ("histogram", "按事件类型统计的模型校验耗时"),
+    "efchat_event_handle_seconds": ("histogram", "按事件类型统计的 handle_event 耗时"),
+    "efchat_events_dropped_total": ("counter", "处理出错而被丢弃的事件数量"),
+    "efchat_events_overflow_total": ("counter", "会话积压过多而被丢弃的事件数量"),
+    "efchat_frames_filtered_total": ("counter", "按 cmd 统计在校验前被过滤的数据帧数量"),
+    "efchat_reconnects_total": ("counter", "按 Bot 统计的重连次数"),
+    "efchat_send_queue_depth": ("gauge", "按 Bot 统计的发送队列深度"),
+    "efchat_dispatch_pending": ("gauge", "等待处理的事件数量"),
+}
+"""指标名称与 (类型, 说明)"""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """适配器指标，可渲染为 Prometheus 文本格式
+
+    未启用时调用方应先检查 `enabled`，以免产生计时与统计开销。
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, list[float]]] = {}
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1) -> None:
+        """计数器增加 `value`"""
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        """直方图记录一个观测值"""
+        series = self._histograms.setdefault(name, {})
+        if (data := series.get(labels)) is None:
+            # 各分桶计数 + 超出最大分桶的计数 + 总和
+            data = series[labels] = [0.0] * (len(_BUCKETS) + 2)
+        data[bisect.bisect_left(_BUCKETS, value)] += 1
+        data[-1] += value
+
+    def render(self, gauges: Optional[dict[str, dict[Labels, float]]] = None) -> str:
+        """渲染为 Prometheus 文本格式"""
+        lines: list[str] = []
+
+        def _header(name: str):
+            kind, help_ = METRICS.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in self._counters.items():
+            _header(name)
+            lines.extend(
+                f"{name}{_format_labels(labels)} {value}"
+                for labels, value in series.items()
+            )
+        for name, series in self._histograms.items():
+            _header(name)
+            for labels, data in series.items():
+                cumulative = 0.0
+                for bound, count in zip(_BUCKETS, data):
+                    cumulative += count
+                    le = _format_labels(labels, f'le="{bound}"')
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                cumulative += data[len(_BUCKETS)]
+                inf = _format_labels(labels, 'le="+Inf"')
+                lines.append(f"{name}_bucket{inf} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {data[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        for name, series in (gauges or {}).items():
+            _header(name)
+            lines.extend(
+                f"{name}{_format_labels(labels)} {value}"
+                for labels, value in series.items()
+            )
+        return "\n".join(lines) + "\n"
+
+
+async def serve_metrics(
+    render: Callable[[], str], host: str, port: int
+) -> asyncio.AbstractServer:
+    """启动一个仅返回指标文本的本地 HTTP 服务"""
+
+    async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # 忽略请求内容，读取到请求头结束即可
+            await reader.readuntil(b"\r\n\r\n")
+            body = render().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                + f"Content-Length: {len(body)}\r\n".encode()
+                + b"Connection: close\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.debug(f"指标请求处理失败: {e}")
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(_handle, host, port)
+    logger.info(f"指标服务已启动: http://{host}:{port}/metrics")
+    return server
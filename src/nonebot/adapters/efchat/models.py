@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class OnlineUser(BaseModel):
@@ -63,3 +63,13 @@ class EFChatBotConfig(BaseModel):
     """认证Token"""
     ignore_self: bool = True
     """忽略自身消息"""
+    send_rate: float = 5.0
+    """发送限速(每秒数据包数)，小于等于 0 时不限速"""
+    send_burst: int = 10
+    """限速允许的突发数据包数量"""
+    send_queue_size: int = 200
+    """发送队列容量，小于等于 0 时不限制"""
+    include_cmds: Optional[set[str]] = None
+    """仅处理这些 `cmd` 的数据帧，为空时处理全部"""
+    exclude_cmds: set[str] = Field(default_factory=set)
+    """不处理这些 `cmd` 的数据帧"""
@@ -0,0 +1,95 @@
+import time
+import asyncio
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterator, Literal, Optional, Union
+from . import codec
+from .utils import logger
+
+Direction = Literal["in", "out"]
+
+_SECRET_KEYS = ("token", "password")
+"""录制发出的数据帧时需要隐去的字段"""
+
+
+class FrameRecorder:
+    """数据帧录制器
+
+    以 JSON Lines 格式追加写入 `[时间戳, Bot 昵称, 方向, 原始数据帧]`，
+    数据帧先缓存在内存中，由独立线程按 `flush_interval` 秒批量写入磁盘。
+    """
+
+    def __init__(self, path: Union[str, Path], flush_interval: float = 1.0):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self._buffer: list[str] = []
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="efchat-recorder"
+        )
+        self._task: Optional[asyncio.Task] = None
+        self.frames = 0
+        """已录制的数据帧数量"""
+
+    def record(self, bot: str, direction: Direction, raw: Union[str, bytes]) -> None:
+        """录制一个数据帧"""
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", "replace")
+        self._buffer.append(codec.dumps([time.time(), bot, direction, raw]))
+        self.frames += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    def record_sent(self, bot: str, data: dict[str, Any], raw: str) -> None:
+        """录制发出的数据帧，隐去其中的登录凭据"""
+        if any(key in data for key in _SECRET_KEYS):
+            raw = codec.dumps(
+                {k: "***" if k in _SECRET_KEYS else v for k, v in data.items()}
+            )
+        self.record(bot, "out", raw)
+
+    async def _flush_loop(self) -> None:
+        while self._buffer:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    @staticmethod
+    def _log_error(future: Future) -> None:
+        if e := future.exception():
+            logger.error(f"数据帧录制写入失败: {type(e)}: {e}")
+
+    def flush(self) -> Optional[Future]:
+        """将缓存的数据帧交给写入线程"""
+        if not self._buffer:
+            return None
+        lines, self._buffer = self._buffer, []
+        future = self._executor.submit(self._write, lines)
+        future.add_done_callback(self._log_error)
+        return future
+
+    def _write(self, lines: list[str]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    async def close(self) -> None:
+        """写入剩余的数据帧并停止写入线程"""
+        if self._task:
+            self._task.cancel()
+        if future := self.flush():
+            await asyncio.wrap_future(future)
+        self._executor.shutdown(wait=True)
+
+
+def read_recording(
+    path: Union[str, Path],
+) -> Iterator[tuple[float, str, Direction, str]]:
+    """逐条读取录制文件，忽略无法解析的行(如写入中断产生的残行)"""
+    with Path(path).open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                ts, bot, direction, raw = codec.loads(line)
+            except (ValueError, TypeError) + codec.DecodeError:
+                continue
+            yield ts, bot, direction, raw
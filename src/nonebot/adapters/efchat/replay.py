@@ -0,0 +1,162 @@
+"""数据帧回放
+
+将 `FrameRecorder` 录制的接收数据帧依次交给 `Adapter._handle_data`(或快速解码路径)处理，可按原始速度或尽可能快地回放，并统计吞吐量与延迟
+
+    python -m nonebot.adapters.efchat.replay frames.jsonl --speed 0 --plugin foo
+"""
+
+import time
+import asyncio
+import argparse
+from functools import partial
+from pathlib import Path
+from typing import Any, Iterable, Optional, Union
+from .adapter import Adapter
+from .bot import Bot
+from .models import EFChatBotConfig
+from .recorder import read_recording
+from .send_queue import SendQueue
+from . import codec
+
+
+def percentile(values: list[float], q: float) -> float:
+    """计算已排序列表的百分位数(最近秩法)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+class _Replayer:
+    def __init__(self, adapter: Adapter):
+        self.adapter = adapter
+        self.latencies: list[float] = []
+        self.sent = 0
+
+    async def _sink(self, data: dict[str, Any]) -> None:
+        self.sent += 1
+
+    def _get_bot(self, nick: str) -> Bot:
+        adapter = self.adapter
+        if nick in adapter.bots:
+            return adapter.bots[nick]  # type: ignore[return-value]
+        cfg = next(
+            (cfg for cfg in adapter.cfg.efchat_bots if cfg.nick == nick),
+            EFChatBotConfig(nick=nick),
+        )
+        bot = adapter._handle_connect(cfg)
+        # 回放时发出的数据包不会真正发送，仅计数
+        adapter.send_queues[bot] = SendQueue(self._sink, 0, 1, 0)
+        adapter.send_queues[bot].start()
+        return bot
+
+    def _on_handled(self, start: float) -> None:
+        self.latencies.append(time.perf_counter() - start)
+
+    async def run(
+        self, path: Union[str, Path], speed: float, bots: Optional[set[str]]
+    ) -> dict[str, Any]:
+        adapter = self.adapter
+        loop = asyncio.get_running_loop()
+        frames = errors = 0
+        first_ts: Optional[float] = None
+        begin = loop.time()
+        try:
+            for ts, nick, direction, raw in read_recording(path):
+                if direction != "in" or (bots and nick not in bots):
+                    continue
+                if speed > 0:
+                    if first_ts is None:
+                        first_ts = ts
+                    delay = begin + (ts - first_ts) / speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                bot = self._get_bot(nick)
+                frames += 1
+                # 统计该数据帧从收到到插件处理完成的延迟
+                on_handled = partial(self._on_handled, time.perf_counter())
+                if adapter.fast_decode and (peeked := adapter.decoder.peek(raw)):
+                    await adapter._handle_raw(bot, raw, *peeked, on_handled)
+                else:
+                    try:
+                        data = codec.loads(raw)
+                    except codec.DecodeError:
+                        errors += 1
+                        continue
+                    await adapter._handle_data(bot, data, on_handled)
+                # 让出事件循环，使分发器可以及时处理事件
+                await asyncio.sleep(0)
+            while adapter.dispatcher.pending:
+                await asyncio.sleep(0.01)
+        finally:
+            for bot in list(adapter.bots.values()):
+                await adapter._release_bot(bot)
+                adapter._handle_disconnect(bot)
+        elapsed = loop.time() - begin
+        latencies = sorted(self.latencies)
+        return {
+            "frames": frames,
+            "events": len(latencies),
+            "errors": errors,
+            "sent": self.sent,
+            "elapsed": elapsed,
+            "events_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+        }
+
+
+async def replay(
+    adapter: Adapter,
+    path: Union[str, Path],
+    speed: float = 0,
+    bots: Optional[Iterable[str]] = None,
+) -> dict[str, Any]:
+    """
+    回放录制文件中接收到的数据帧
+
+    Args:
+        adapter: 适配器实例
+        path: 录制文件路径
+        speed: 回放速度倍率，为 0 时尽可能快地回放
+        bots: 仅回放这些 Bot 的数据帧，为空时回放全部
+
+    Returns:
+        数据帧数量、事件数量、吞吐量(events/s)与延迟百分位数(秒)
+    """
+    return await _Replayer(adapter).run(path, speed, set(bots) if bots else None)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    import nonebot
+
+    parser = argparse.ArgumentParser(description="回放 EFChat 数据帧录制文件")
+    parser.add_argument("path", help="录制文件路径")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="回放速度倍率，0 表示尽可能快"
+    )
+    parser.add_argument("--bot", action="append", help="仅回放指定 Bot 的数据帧")
+    parser.add_argument("--plugin", action="append", default=[], help="加载插件")
+    parser.add_argument("--driver", default="~httpx+~websockets", help="驱动器")
+    args = parser.parse_args(argv)
+
+    nonebot.init(driver=args.driver)
+    nonebot.get_driver().register_adapter(Adapter)
+    for name in args.plugin:
+        nonebot.load_plugin(name)
+    adapter = nonebot.get_adapter(Adapter)
+
+    result = asyncio.run(replay(adapter, args.path, args.speed, args.bot))
+    print(
+        f"frames: {result['frames']}  events: {result['events']}  "
+        f"errors: {result['errors']}  sent: {result['sent']}\n"
+        f"elapsed: {result['elapsed']:.3f}s  "
+        f"throughput: {result['events_per_sec']:.0f} events/s\n"
+        f"latency p50: {result['p50'] * 1000:.3f}ms  "
+        f"p90: {result['p90'] * 1000:.3f}ms  p99: {result['p99'] * 1000:.3f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
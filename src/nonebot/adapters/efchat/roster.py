@@ -0,0 +1,139 @@
+from typing import Optional
+from .models import OnlineUser
+from .event import (
+    Event,
+    OnlineSetEvent,
+    JoinRoomEvent,
+    LeaveRoomEvent,
+    ChangeNickEvent,
+    OnafkAddEvent,
+    OnafkRemoveEvent,
+    OnafkRemoveOnlyEvent,
+)
+
+
+class Roster:
+    """房间在线用户名单
+
+    由 `onlineSet`/`onlineAdd`/`onlineRemove`/`changenick`/`onafk*` 事件增量维护，
+    按昵称、trip、用户ID 与等级建立索引。
+    """
+
+    def __init__(self):
+        self._users: dict[str, OnlineUser] = {}
+        self._by_trip: dict[str, set[str]] = {}
+        self._by_userid: dict[int, str] = {}
+        self._by_level: dict[int, set[str]] = {}
+        self._afk: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __contains__(self, nick: str) -> bool:
+        return nick in self._users
+
+    def clear(self) -> None:
+        """清空名单"""
+        self._users.clear()
+        self._by_trip.clear()
+        self._by_userid.clear()
+        self._by_level.clear()
+        self._afk.clear()
+
+    def add(self, user: OnlineUser) -> None:
+        """添加或更新用户"""
+        self.remove(user.nick)
+        self._users[user.nick] = user
+        self._by_trip.setdefault(user.trip, set()).add(user.nick)
+        self._by_userid[user.userid] = user.nick
+        self._by_level.setdefault(user.level, set()).add(user.nick)
+
+    def remove(self, nick: str) -> Optional[OnlineUser]:
+        """移除用户，返回被移除的用户信息"""
+        user = self._users.pop(nick, None)
+        self._afk.discard(nick)
+        if user is None:
+            return None
+        _discard(self._by_trip, user.trip, nick)
+        _discard(self._by_level, user.level, nick)
+        if self._by_userid.get(user.userid) == nick:
+            del self._by_userid[user.userid]
+        return user
+
+    def set_afk(self, nick: str, afk: bool) -> None:
+        """设置用户的 AFK 状态"""
+        if afk:
+            self._afk.add(nick)
+        else:
+            self._afk.discard(nick)
+
+    def apply(self, event: Event, self_nick: str, channel: str) -> None:
+        """根据事件更新名单"""
+        if isinstance(event, OnlineSetEvent):
+            self.clear()
+            for user in event.users:
+                self.add(user)
+        elif isinstance(event, JoinRoomEvent):
+            self.add(
+                OnlineUser(
+                    nick=event.nick,
+                    trip=event.trip,
+                    utype=event.utype,
+                    hash=event.hash,
+                    level=event.level,
+                    userid=event.userid,
+                    channel=channel,
+                    isme=event.nick == self_nick,
+                )
+            )
+        elif isinstance(event, LeaveRoomEvent):
+            self.remove(event.nick)
+        elif isinstance(event, ChangeNickEvent):
+            # changenick 只会下发给自身，旧昵称以名单中 isme 的用户为准
+            me = next((u for u in self._users.values() if u.isme), None)
+            if me is not None and me.nick != event.nick:
+                afk = me.nick in self._afk
+                self.remove(me.nick)
+                me.nick = event.nick
+                self.add(me)
+                self.set_afk(me.nick, afk)
+        elif isinstance(event, OnafkAddEvent):
+            self.set_afk(event.nick, True)
+        elif isinstance(event, (OnafkRemoveEvent, OnafkRemoveOnlyEvent)):
+            self.set_afk(event.nick, False)
+
+    def get(self, nick: str) -> Optional[OnlineUser]:
+        """按昵称查询用户"""
+        return self._users.get(nick)
+
+    def get_by_userid(self, userid: int) -> Optional[OnlineUser]:
+        """按用户ID查询用户"""
+        nick = self._by_userid.get(userid)
+        return None if nick is None else self._users.get(nick)
+
+    def get_by_trip(self, trip: str) -> list[OnlineUser]:
+        """按 trip 查询用户"""
+        return [self._users[nick] for nick in self._by_trip.get(trip, ())]
+
+    def get_by_level(self, level: int) -> list[OnlineUser]:
+        """按等级查询用户"""
+        return [self._users[nick] for nick in self._by_level.get(level, ())]
+
+    def users(self) -> list[OnlineUser]:
+        """所有在线用户"""
+        return list(self._users.values())
+
+    def is_afk(self, nick: str) -> bool:
+        """用户是否处于 AFK 状态"""
+        return nick in self._afk
+
+    def afk_users(self) -> list[str]:
+        """所有处于 AFK 状态的用户昵称"""
+        return list(self._afk)
+
+
+def _discard(index: dict, key, nick: str) -> None:
+    if nicks := index.get(key):
+        nicks.discard(nick)
+        if not nicks:
+            del index[key]
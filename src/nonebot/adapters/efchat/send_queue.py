@@ -0,0 +1,223 @@
+import time
+import asyncio
+from collections import deque
+from typing import Any, Callable, Awaitable, Optional
+from .exception import NetworkError
+
+PRIORITY_HIGH = 0
+"""心跳与私聊"""
+PRIORITY_NORMAL = 1
+"""其他指令"""
+PRIORITY_LOW = 2
+"""房间消息"""
+
+
+def packet_priority(data: dict[str, Any]) -> int:
+    """根据 `cmd` 判断数据包所属的优先级通道"""
+    cmd = data.get("cmd")
+    if cmd in ("ping", "whisper"):
+        return PRIORITY_HIGH
+    if cmd == "chat":
+        return PRIORITY_LOW
+    return PRIORITY_NORMAL
+
+
+class TokenBucket:
+    """令牌桶限速器，`rate <= 0` 时不限速"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        """取得一个令牌，不足时等待补充"""
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            elapsed, self.updated = now - self.updated, now
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SendQueue:
+    """单个 Bot 的出站发送队列
+
+    由独立的写任务按优先级通道依次取出数据包，并受令牌桶限速。
+    设置了 `coalesce_window` 时，窗口内连续排队的房间消息(`show`、`head` 相同)
+    会以换行拼接为一个数据包发送，合并后的文本不超过 `coalesce_max_length`。
+    """
+
+    def __init__(
+        self,
+        send: Callable[[dict[str, Any]], Awaitable[None]],
+        rate: float,
+        burst: int,
+        maxsize: int,
+        coalesce_window: float = 0,
+        coalesce_max_length: int = 0,
+    ):
+        self._send = send
+        self._coalesce_window = coalesce_window
+        self._coalesce_max_length = coalesce_max_length
+        self._bucket = TokenBucket(rate, burst)
+        self._lanes: tuple[deque, ...] = (deque(), deque(), deque())
+        self._maxsize = maxsize
+        self._slots = asyncio.Semaphore(maxsize) if maxsize > 0 else None
+        self._closed = False
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+        """已发送数据包数量"""
+        self.total_wait = 0.0
+        """数据包累计排队时间(秒)"""
+        self.max_wait = 0.0
+        """单个数据包最长排队时间(秒)"""
+        self.coalesced = 0
+        """被合并到其他数据包中发送的房间消息数量"""
+
+    def start(self) -> None:
+        """启动写任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._writer())
+
+    async def close(self) -> None:
+        """停止写任务，并使所有未发送的数据包失败"""
+        self._closed = True
+        if self._slots:
+            # 唤醒所有等待队列空位的调用方
+            for _ in range(self._maxsize):
+                self._slots.release()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        for lane in self._lanes:
+            while lane:
+                _, _, future = lane.popleft()
+                if not future.done():
+                    future.set_exception(NetworkError("连接已断开，数据包未发送"))
+
+    @property
+    def depth(self) -> int:
+        """当前排队中的数据包数量"""
+        return sum(len(lane) for lane in self._lanes)
+
+    def stats(self) -> dict[str, Any]:
+        """队列状态统计"""
+        return {
+            "depth": self.depth,
+            "lanes": [len(lane) for lane in self._lanes],
+            "sent": self.sent,
+            "avg_wait": self.total_wait / self.sent if self.sent else 0.0,
+            "max_wait": self.max_wait,
+            "coalesced": self.coalesced,
+        }
+
+    async def put(self, data: dict[str, Any], priority: Optional[int] = None) -> None:
+        """将数据包放入队列，并等待其被实际发送"""
+        if priority is None:
+            priority = packet_priority(data)
+        if self._slots:
+            await self._slots.acquire()
+        if self._closed:
+            raise NetworkError("连接已断开，数据包未发送")
+        future = asyncio.get_running_loop().create_future()
+        self._lanes[priority].append((time.monotonic(), data, future))
+        self._ready.set()
+        await future
+
+    def _pop(self):
+        for lane in self._lanes:
+            if lane:
+                return lane.popleft()
+        return None
+
+    def _coalesce_delay(self) -> float:
+        """下一个出队的房间消息距离合并窗口结束的秒数"""
+        for lane in self._lanes:
+            if lane:
+                enqueued, data, _ = lane[0]
+                if data.get("cmd") != "chat":
+                    return 0.0
+                return enqueued + self._coalesce_window - time.monotonic()
+        return 0.0
+
+    def _coalesce(self, data: dict[str, Any], futures: list[asyncio.Future]):
+        """将紧随其后、可合并的房间消息拼接到 `data` 中"""
+        text = data.get("text")
+        if data.get("cmd") != "chat" or not isinstance(text, str):
+            return data
+        lane = self._lanes[PRIORITY_LOW]
+        texts, length = [text], len(text)
+        others = {k: v for k, v in data.items() if k != "text"}
+        while lane:
+            _, next_data, next_future = lane[0]
+            if next_future.done():
+                # 调用方已取消
+                lane.popleft()
+                if self._slots:
+                    self._slots.release()
+                continue
+            next_text = next_data.get("text")
+            if (
+                not isinstance(next_text, str)
+                or {k: v for k, v in next_data.items() if k != "text"} != others
+                or length + 1 + len(next_text) > self._coalesce_max_length
+            ):
+                break
+            lane.popleft()
+            if self._slots:
+                self._slots.release()
+            texts.append(next_text)
+            length += 1 + len(next_text)
+            futures.append(next_future)
+        if len(texts) == 1:
+            return data
+        self.coalesced += len(texts) - 1
+        return {**data, "text": "\n".join(texts)}
+
+    async def _writer(self) -> None:
+        while True:
+            if not self.depth:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            if self._coalesce_window > 0 and (delay := self._coalesce_delay()) > 0:
+                # 最先出队的房间消息仍在合并窗口内，等待后续的房间消息
+                await asyncio.sleep(delay)
+                continue
+            await self._bucket.acquire()
+            # 等待令牌期间可能有更高优先级的数据包入队，因此在取得令牌后再出队
+            item = self._pop()
+            if item is None:
+                continue
+            enqueued, data, future = item
+            if self._slots:
+                self._slots.release()
+            if future.done():
+                continue
+            futures = [future]
+            if self._coalesce_window > 0:
+                data = self._coalesce(data, futures)
+            wait = time.monotonic() - enqueued
+            self.sent += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            try:
+                await self._send(data)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for future in futures:
+                    if not future.done():
+                        future.set_result(None)
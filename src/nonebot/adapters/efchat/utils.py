@@ -1,77 +1,137 @@
+import io
+import os
+import sys
+import time
 import asyncio
-import json
-import aiofiles
-from typing import Union
+import tempfile
+from typing import IO, Callable, Optional, Union
+from nonebot import get_driver
+from nonebot import log as nb_log
+from nonebot.log import logger as nb_logger
 from nonebot.utils import logger_wrapper
 from nonebot.drivers import Request, Response
 from .exception import NetworkError, ActionFailed
+from . import codec
+from .voice_cache import voice_key
 
 log = logger_wrapper("EFChat")
 
+_CHUNK_SIZE = 64 * 1024
+"""流式下载的分块大小"""
+_SPOOL_SIZE = 1024 * 1024
+"""下载的语音超过该大小时转存到临时文件"""
+
 
 def sanitize(message: str) -> str:
     """将 `<` 和 `>` 转换为 HTML 实体编码"""
     return message.replace("<", "&lt;").replace(">", "&gt;")
 
 
-async def download_audio(adapter, url: str) -> bytes:
+async def download_audio(adapter, url: str, max_size: Optional[int] = None) -> bytes:
     """从 URL 下载音频文件并返回 `bytes` 数据"""
-    request = Request(
-        method="GET",
-        url=url,
-        headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36 Edg/91.0.864.59",
-            "Origin": "https://efchat.melon.fish",
-            "Referer": "https://efchat.melon.fish/",
-        },
-    )
+    buffer = io.BytesIO()
+    await download_audio_to(adapter, url, buffer, max_size)
+    return buffer.getvalue()
+
+
+async def download_audio_to(
+    adapter, url: str, fp: IO[bytes], max_size: Optional[int] = None
+) -> int:
+    """从 URL 分块下载音频文件写入 `fp`，超过 `max_size` 时立即中止，返回写入的字节数"""
+    if max_size is None:
+        max_size = adapter.cfg.efchat_voice_max_size
+    request = Request(method="GET", url=url)
+    received = 0
+    stream = adapter.http.stream_request(request, chunk_size=_CHUNK_SIZE)
     try:
-        response: Response = await adapter.driver.request(request)
+        async for response in stream:
+            if response.status_code != 200:
+                raise ActionFailed(response)
+            if not received:
+                length = response.headers.get("Content-Length")
+                if length and length.isdigit() and int(length) > max_size:
+                    raise ValueError(f"语音 {url} 大小 {length} 超过上限 {max_size}")
+            chunk = response.content
+            if not isinstance(chunk, bytes):
+                raise NetworkError("音频数据无效，无法上传")
+            received += len(chunk)
+            if received > max_size:
+                raise ValueError(f"语音 {url} 大小超过上限 {max_size}")
+            fp.write(chunk)
+        if not received:
+            # 驱动器不会为空的响应体产生任何分块，无法得知状态码
+            raise NetworkError(f"语音 {url} 下载内容为空")
+    except (ActionFailed, NetworkError, ValueError):
+        raise
     except Exception as e:
         raise NetworkError(f"语音 {url} 下载失败: {e}") from e
-    if response.status_code != 200:
-        raise ActionFailed(response)
-    if isinstance(response.content, bytes):
-        return response.content
-    raise NetworkError("音频数据无效，无法上传")
+    finally:
+        await stream.aclose()
+    return received
 
 
 async def upload_voice(
     adapter, url: Union[str, None], path: Union[str, None], raw: Union[bytes, None]
 ) -> str:
-    """上传语音文件并返回 `src_name`"""
+    """上传语音文件并返回 `src_name`，相同的语音优先使用缓存"""
+    if adapter.voice_cache is None:
+        return await _upload_voice(adapter, url, path, raw)
+    # 计算 raw 的摘要与读取文件信息可能较慢，在线程中执行
+    key = (
+        await asyncio.to_thread(voice_key, url, path, raw)
+        if raw or path
+        else voice_key(url, path, raw)
+    )
+    return await adapter.voice_cache.get_or_upload(
+        key, lambda: _upload_voice(adapter, url, path, raw)
+    )
+
+
+async def _upload_voice(
+    adapter, url: Union[str, None], path: Union[str, None], raw: Union[bytes, None]
+) -> str:
+    """读取或下载语音数据并上传，不会将文件整体读入内存"""
+    max_size = adapter.cfg.efchat_voice_max_size
     if raw:
-        file_data = raw
-    elif path:
-        file_data = await asyncio.create_task(_read_audio_file(path))
-    elif url:
-        file_data = await download_audio(adapter, url)
-    else:
-        raise ValueError("音频数据无效，无法上传")
+        if len(raw) > max_size:
+            raise ValueError(f"语音大小 {len(raw)} 超过上限 {max_size}")
+        return await _post_voice(adapter, raw)
+    if path:
+        size = (await asyncio.to_thread(os.stat, path)).st_size
+        if size > max_size:
+            raise ValueError(f"语音 {path} 大小 {size} 超过上限 {max_size}")
+        # 以文件对象上传，由 HTTP 客户端分块读取
+        with await asyncio.to_thread(open, path, "rb") as f:
+            return await _post_voice(adapter, f)
+    if url:
+        # 小文件留在内存中，较大的文件自动转存到临时文件
+        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_SIZE) as f:
+            await download_audio_to(adapter, url, f, max_size)
+            f.seek(0)
+            return await _post_voice(adapter, f)
+    raise ValueError("音频数据无效，无法上传")
+
 
+async def _post_voice(adapter, file_data: Union[bytes, IO[bytes]]) -> str:
+    """将语音数据 POST 到 `/voice`"""
     request = Request(
         method="POST",
-        url="https://efchat.melon.fish/voice",
-        headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36 Edg/91.0.864.59",
-            "Origin": "https://efchat.melon.fish",
-            "Referer": "https://efchat.melon.fish/",
-        },
+        url=adapter.cfg.efchat_voice_url,
         files={
             "upfile": file_data,
         },
     )
     try:
-        response: Response = await adapter.driver.request(request)
+        response: Response = await adapter.http.request(request)
     except Exception as e:
         raise NetworkError(str(e)) from e
     if response.status_code != 200:
         raise ActionFailed(response)
+    if not response.content:
+        logger.warning("语音上传:响应内容为空")
+        raise ActionFailed(response)
     try:
-        if response.content:
-            result = json.loads(response.content)
-        else:
-            logger.warning("语音上传:响应内容为空")
+        result = codec.loads(response.content)
     except Exception as e:
         raise ActionFailed(response) from e
     src = result.get("src")
@@ -80,40 +140,120 @@ async def upload_voice(
     return src
 
 
-async def _read_audio_file(path: str) -> bytes:
-    """异步文件读取"""
-    async with aiofiles.open(path, "rb") as f:
-        return await f.read()
+class LogRateLimiter:
+    """日志限流器
+
+    每秒最多放行 `rate` 条(允许 `burst` 条突发)，被丢弃的条数会在下一次放行时一并提示
+    """
+
+    def __init__(self, rate: float, burst: int = 10):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.suppressed = 0
+        """自上次放行以来被丢弃的日志数量"""
+
+    def allow(self) -> bool:
+        """是否放行一条日志"""
+        now = time.monotonic()
+        elapsed, self.updated = now - self.updated, now
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.suppressed += 1
+        return False
+
+
+LogMessage = Union[str, Callable[[], str]]
+"""日志内容，可以是返回字符串的函数，仅在实际输出时才调用"""
 
 
 class logger:
+    _level_key: Union[int, str, None] = None
+    _level_no = 0
+    _level_nos: dict[str, int] = {}
+
     @classmethod
-    def log(cls, level, msg):
+    def _min_level(cls) -> int:
+        try:
+            level = get_driver().config.log_level
+        except ValueError:
+            return 0
+        if level != cls._level_key:
+            cls._level_key = level
+            cls._level_no = (
+                level if isinstance(level, int) else nb_logger.level(level.upper()).no
+            )
+        return cls._level_no
+
+    @classmethod
+    def is_enabled(cls, level: str) -> bool:
+        """该等级的日志是否会被输出(依据 NoneBot 的 `LOG_LEVEL` 配置)"""
+        if (no := cls._level_nos.get(level)) is None:
+            no = cls._level_nos[level] = nb_logger.level(level).no
+        return no >= cls._min_level()
+
+    @classmethod
+    def log(
+        cls, level: str, msg: LogMessage, limiter: Optional[LogRateLimiter] = None
+    ):
+        if not cls.is_enabled(level):
+            return
+        if limiter is not None:
+            if not limiter.allow():
+                return
+            suppressed, limiter.suppressed = limiter.suppressed, 0
+        else:
+            suppressed = 0
+        if callable(msg):
+            msg = msg()
+        if suppressed:
+            msg = f"{msg} (已省略 {suppressed} 条同类日志)"
         try:
             log(level, msg)
         except Exception:
             log(level, sanitize(msg))
 
     @classmethod
-    def debug(cls, msg):
-        cls.log("DEBUG", msg)
+    def debug(cls, msg: LogMessage, limiter: Optional[LogRateLimiter] = None):
+        cls.log("DEBUG", msg, limiter)
 
     @classmethod
-    def warning(cls, msg):
-        cls.log("WARNING", msg)
+    def warning(cls, msg: LogMessage, limiter: Optional[LogRateLimiter] = None):
+        cls.log("WARNING", msg, limiter)
 
     @classmethod
-    def error(cls, msg):
-        cls.log("ERROR", msg)
+    def error(cls, msg: LogMessage, limiter: Optional[LogRateLimiter] = None):
+        cls.log("ERROR", msg, limiter)
 
     @classmethod
-    def critical(cls, msg):
-        cls.log("CRITICAL", msg)
+    def critical(cls, msg: LogMessage, limiter: Optional[LogRateLimiter] = None):
+        cls.log("CRITICAL", msg, limiter)
 
     @classmethod
-    def success(cls, msg):
-        cls.log("SUCCESS", msg)
+    def success(cls, msg: LogMessage, limiter: Optional[LogRateLimiter] = None):
+        cls.log("SUCCESS", msg, limiter)
 
     @classmethod
-    def info(cls, msg):
-        cls.log("INFO", msg)
+    def info(cls, msg: LogMessage, limiter: Optional[LogRateLimiter] = None):
+        cls.log("INFO", msg, limiter)
+
+
+def enable_async_logging() -> bool:
+    """将 NoneBot 默认的日志输出替换为队列 + 后台线程写出，返回是否替换成功"""
+    try:
+        nb_logger.remove(nb_log.logger_id)
+    except ValueError:
+        # 默认输出已被用户移除或替换
+        return False
+    nb_log.logger_id = nb_logger.add(
+        sys.stdout,
+        level=0,
+        diagnose=False,
+        filter=nb_log.default_filter,
+        format=nb_log.default_format,
+        enqueue=True,
+    )
+    return True
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+import contextlib
+from pathlib import Path
+from collections import OrderedDict
+from typing import Callable, Awaitable, Optional, Union
+from . import utils
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    # 所有调用方都已取消时避免 "exception was never retrieved" 警告
+    if not task.cancelled():
+        task.exception()
+
+
+def voice_key(
+    url: Optional[str], path: Optional[str], raw: Optional[bytes]
+) -> Optional[str]:
+    """
+    计算语音数据的缓存键
+
+    - raw: 内容的 SHA-256
+    - path: 绝对路径 + 修改时间 + 文件大小，文件变化后自动失效且无需读取文件
+    - url: 地址本身
+    """
+    if raw:
+        return f"raw:{hashlib.sha256(raw).hexdigest()}"
+    if path:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return f"path:{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+    return f"url:{url}" if url else None
+
+
+class VoiceCache:
+    """语音上传缓存
+
+    以 LRU 方式保存语音数据到 `src_name` 的映射，支持数量与存活时间限制，
+    可选持久化到磁盘；相同语音的并发上传只会实际执行一次。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl: Optional[float] = None,
+        path: Optional[Union[str, Path]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task[str]] = {}
+        self._write_lock = threading.Lock()
+        self.hits = 0
+        """缓存命中次数"""
+        self.misses = 0
+        """缓存未命中次数"""
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，过期的条目会被移除"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        src, created = entry
+        if self.ttl is not None and time.time() - created > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return src
+
+    def set(self, key: str, src: str) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        self._entries[key] = (src, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        self._save()
+
+    async def get_or_upload(
+        self, key: Optional[str], upload: Callable[[], Awaitable[str]]
+    ) -> str:
+        """命中缓存时直接返回，否则上传；同一 `key` 的并发请求共享同一次上传"""
+        if key is None:
+            return await upload()
+        if src := self.get(key):
+            self.hits += 1
+            return src
+        if (task := self._inflight.get(key)) is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            # 上传由缓存持有的独立任务执行，某个调用方被取消不会影响其他等待者
+            task = asyncio.ensure_future(self._upload(key, upload))
+            task.add_done_callback(_retrieve_exception)
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _upload(self, key: str, upload: Callable[[], Awaitable[str]]) -> str:
+        try:
+            src = await upload()
+            if src:
+                self.set(key, src)
+            return src
+        finally:
+            self._inflight.pop(key, None)
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            utils.logger.warning(f"语音缓存读取失败: {e}")
+            return
+        for key, (src, created) in entries.items():
+            self._entries[key] = (src, created)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        snapshot = dict(self._entries)
+        with contextlib.suppress(RuntimeError):
+            asyncio.get_running_loop().run_in_executor(None, self._write, snapshot)
+
+    def _write(self, snapshot: dict[str, tuple[str, float]]) -> None:
+        assert self.path is not None
+        try:
+            with self._write_lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(f"{self.path.suffix}.tmp")
+                tmp.write_text(json.dumps(snapshot), encoding="utf-8")
+                tmp.replace(self.path)
+        except Exception as e:
+            utils.logger.warning(f"语音缓存保存失败: {e}")
@@ -0,0 +1,15 @@
+import pytest
+from nonebug import NONEBOT_INIT_KWARGS, NONEBOT_START_LIFESPAN
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.stash[NONEBOT_INIT_KWARGS] = {"driver": "~httpx+~websockets"}
+    config.stash[NONEBOT_START_LIFESPAN] = False
+
+
+@pytest.fixture(scope="session", autouse=True)
+def after_nonebot_init(after_nonebot_init: None) -> None:
+    import nonebot
+    from nonebot.adapters.efchat import Adapter
+
+    nonebot.get_driver().register_adapter(Adapter)
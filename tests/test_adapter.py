@@ -0,0 +1,51 @@
+import asyncio
+
+import nonebot
+
+from nonebot.adapters.efchat import Adapter
+from nonebot.adapters.efchat.models import EFChatBotConfig
+
+
+async def test_connection_state_survives_nick_change():
+    adapter = nonebot.get_adapter(Adapter)
+    cfg = EFChatBotConfig(nick="bot_a")
+    adapter._bot_configs["bot_a"] = cfg
+    try:
+        await adapter._forward_ws(cfg, "bot_a")
+        cfg.nick = "bot_b"
+
+        assert adapter.get_connection_state("bot_a") == "stopped"
+        assert adapter.get_connection_state("bot_b") == "stopped"
+        assert adapter.get_connection_state("bot_c") is None
+        assert "bot_b" not in adapter.connection_states
+    finally:
+        adapter._bot_configs.pop("bot_a", None)
+        adapter.connection_states.pop("bot_a", None)
+
+
+async def test_connect_ws_continues_when_metrics_port_is_taken():
+    adapter = nonebot.get_adapter(Adapter)
+    taken = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+    port = taken.sockets[0].getsockname()[1]
+    cfg = EFChatBotConfig(nick="bot_m")
+    original = adapter.cfg
+    adapter.cfg = original.model_copy(
+        update={
+            "efchat_metrics_host": "127.0.0.1",
+            "efchat_metrics_port": port,
+            "efchat_bots": [cfg],
+        }
+    )
+    try:
+        await adapter.connect_ws()
+        await adapter.tasks["bot_m"]
+
+        assert adapter._metrics_server is None
+        assert adapter.get_connection_state("bot_m") == "stopped"
+    finally:
+        adapter.cfg = original
+        adapter.tasks.pop("bot_m", None)
+        adapter._bot_configs.pop("bot_m", None)
+        adapter.connection_states.pop("bot_m", None)
+        taken.close()
+        await taken.wait_closed()
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from nonebot.compat import type_validate_python
+
+from nonebot.adapters.efchat.correlation import ReplyWaiter
+from nonebot.adapters.efchat.event import ChangeNickEvent, SystemNoticeEvent
+from nonebot.adapters.efchat.exception import ActionFailed
+
+
+def _warn(text: str) -> SystemNoticeEvent:
+    return type_validate_python(
+        SystemNoticeEvent, {"cmd": "warn", "text": text, "time": 0}
+    )
+
+
+async def test_rejection_fails_oldest_waiter():
+    waiter = ReplyWaiter()
+    first = waiter.expect("changenick")
+    second = waiter.expect("changenick")
+    assert waiter.pending("warn")
+
+    assert waiter.resolve(_warn("昵称已被占用"))
+    with pytest.raises(ActionFailed) as exc_info:
+        await first
+    assert exc_info.value.message == "昵称已被占用"
+
+    reply = type_validate_python(
+        ChangeNickEvent, {"cmd": "changenick", "nick": "new", "time": 0}
+    )
+    assert waiter.resolve(reply)
+    assert await second is reply
+    assert not waiter.pending("warn")
+
+
+@pytest.mark.parametrize(
+    ("cmd", "text"),
+    [("info", "alice 邀请你加入 lounge"), ("warn", "发送速度过快"), ("info", "昵称已被占用")],
+)
+async def test_unrelated_notice_does_not_reject(cmd: str, text: str):
+    waiter = ReplyWaiter()
+    future = waiter.expect("changenick")
+    notice = type_validate_python(
+        SystemNoticeEvent, {"cmd": cmd, "text": text, "time": 0}
+    )
+    assert not waiter.resolve(notice)
+    assert not future.done()
+
+    reply = type_validate_python(
+        ChangeNickEvent, {"cmd": "changenick", "nick": "NewNick", "time": 0}
+    )
+    assert waiter.resolve(reply)
+    assert await future is reply
+
+
+async def test_get_old_is_not_rejected_by_warn():
+    waiter = ReplyWaiter()
+    future = waiter.expect("list")
+    assert not waiter.pending("warn")
+    assert not waiter.resolve(_warn("昵称已被占用"))
+    assert not future.done()
+    future.cancel()
+    await asyncio.sleep(0)
+
+
+async def test_info_does_not_reject_join():
+    waiter = ReplyWaiter()
+    future = waiter.expect("onlineSet")
+    info = type_validate_python(
+        SystemNoticeEvent, {"cmd": "info", "text": "欢迎", "time": 0}
+    )
+    assert not waiter.resolve(info)
+    assert not future.done()
+    future.cancel()
+    await asyncio.sleep(0)
@@ -0,0 +1,39 @@
+import asyncio
+
+from nonebot.adapters.efchat.dispatcher import Dispatcher
+
+
+async def test_session_backlog_is_capped():
+    dispatcher = Dispatcher(workers=4, max_pending=3)
+    release = asyncio.Event()
+    handled: list[str] = []
+
+    def handler(name: str):
+        async def _():
+            await release.wait()
+            handled.append(name)
+
+        return _
+
+    accepted = [dispatcher.submit("a", handler(f"a{i}")) for i in range(5)]
+    assert accepted == [True, True, True, False, False]
+    # 其他会话不受影响
+    assert dispatcher.submit("b", handler("b0"))
+    assert dispatcher.dropped == 2
+    assert dispatcher.pending == 4
+
+    release.set()
+    while dispatcher.pending:
+        await asyncio.sleep(0)
+    assert sorted(handled) == ["a0", "a1", "a2", "b0"]
+    # 积压消化后可以继续提交
+    assert dispatcher.submit("a", handler("a5"))
+    await dispatcher.shutdown()
+
+
+async def test_unlimited_by_default():
+    dispatcher = Dispatcher(workers=1)
+    never = asyncio.Event()
+    assert all(dispatcher.submit("a", never.wait) for _ in range(100))
+    assert dispatcher.dropped == 0
+    await dispatcher.shutdown()
@@ -0,0 +1,56 @@
+import asyncio
+
+from nonebot.adapters.efchat.exception import ActionFailed
+from nonebot.adapters.efchat.heartbeat import Heartbeat
+
+
+async def _ping() -> None:
+    pass
+
+
+async def test_quiet_connection_stays_alive_while_probe_replies():
+    hb = Heartbeat(interval=0.01, timeout=0.05)
+    probes = 0
+
+    async def probe() -> None:
+        nonlocal probes
+        probes += 1
+        await asyncio.sleep(0.001)
+
+    task = asyncio.create_task(hb.run(_ping, probe))
+    await asyncio.sleep(0.2)
+    assert not task.done()
+    task.cancel()
+    assert probes >= 3
+    assert hb.rtt is not None and hb.rtt < 0.05
+
+
+async def test_rejected_probe_counts_as_reply():
+    hb = Heartbeat(interval=0.01, timeout=0.05)
+
+    async def probe() -> None:
+        raise ActionFailed(message="发送速度过快")
+
+    task = asyncio.create_task(hb.run(_ping, probe))
+    await asyncio.sleep(0.1)
+    assert not task.done()
+    task.cancel()
+
+
+async def test_unanswered_probe_ends_heartbeat():
+    hb = Heartbeat(interval=0.01, timeout=0.05)
+
+    async def probe() -> None:
+        await asyncio.sleep(10)
+
+    await asyncio.wait_for(hb.run(_ping, probe), 1)
+    assert hb.rtt is None
+
+
+async def test_no_rtt_without_timeout():
+    hb = Heartbeat(interval=0.01)
+    task = asyncio.create_task(hb.run(_ping))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    assert hb.pings >= 2
+    assert hb.rtt is None
@@ -0,0 +1,85 @@
+import nonebot
+from nonebot.compat import type_validate_python
+
+from nonebot.adapters.efchat import Adapter, Bot
+from nonebot.adapters.efchat.event import ChannelMessageEvent, ListHistoryEvent
+from nonebot.adapters.efchat.history import HistoryStore
+from nonebot.adapters.efchat.models import EFChatBotConfig
+
+CHAT = {
+    "cmd": "chat",
+    "nick": "alice",
+    "trip": "abcdef",
+    "level": 105,
+    "head": "",
+    "text": "早上好",
+    "channel": "NewPR",
+    "time": 1700000000000,
+}
+
+
+def _history(msg_id: int) -> ListHistoryEvent:
+    item = {
+        "id": msg_id,
+        "channel": "NewPR",
+        "nick": "alice",
+        "content": "早上好",
+        "time": "1700000000",
+        "show": 1,
+        "head": "",
+        "trip": "abcdef",
+    }
+    return type_validate_python(
+        ListHistoryEvent, {"cmd": "list", "text": [item], "time": 0}
+    )
+
+
+async def test_live_messages_are_deduplicated():
+    store = HistoryStore(":memory:")
+    # 同一房间的两个 Bot 各收到一次，随后 get_old 再次返回该消息
+    store.record(type_validate_python(ChannelMessageEvent, CHAT), "NewPR")
+    store.record(type_validate_python(ChannelMessageEvent, CHAT), "NewPR")
+    store.record(_history(42), "NewPR")
+    store.record(_history(42), "NewPR")
+    rows = await store.query(channel="NewPR")
+    await store.close()
+    assert [row.id for row in rows] == [42]
+
+
+async def test_history_then_live_is_deduplicated():
+    store = HistoryStore(":memory:")
+    store.record(_history(7), "NewPR")
+    store.record(type_validate_python(ChannelMessageEvent, CHAT), "NewPR")
+    rows = await store.query()
+    await store.close()
+    assert [row.id for row in rows] == [7]
+
+
+async def test_distinct_live_messages_are_kept():
+    store = HistoryStore(":memory:")
+    store.record(type_validate_python(ChannelMessageEvent, CHAT), "NewPR")
+    store.record(
+        type_validate_python(ChannelMessageEvent, {**CHAT, "time": CHAT["time"] + 1}),
+        "NewPR",
+    )
+    rows = await store.query()
+    await store.close()
+    assert len(rows) == 2
+
+
+def test_channel_recorded_by_one_bot():
+    adapter = nonebot.get_adapter(Adapter)
+    bots = [
+        Bot(adapter, nick, EFChatBotConfig(nick=nick, channel=channel))
+        for nick, channel in (("a", "NewPR"), ("b", "NewPR"), ("c", "Other"))
+    ]
+    for bot in bots:
+        adapter.bots_ws[bot] = None  # type: ignore[assignment]
+    try:
+        event = type_validate_python(ChannelMessageEvent, CHAT)
+        owners = [adapter._history_owner(bot, event) for bot in bots]
+        assert owners == [True, False, True]
+        assert adapter._history_owner(bots[1], _history(1))
+    finally:
+        for bot in bots:
+            adapter.bots_ws.pop(bot)
@@ -0,0 +1,21 @@
+import os
+
+from nonebot.adapters.efchat import message
+
+
+def test_image_cache_is_bounded_by_size():
+    for _ in range(40):
+        message._raw_data_url(os.urandom(600 * 1024))
+    assert message._image_cache_bytes <= message._IMAGE_CACHE_BYTES
+    assert message._image_cache_bytes == sum(
+        map(len, message._image_cache.values())
+    )
+
+
+def test_large_image_is_not_cached():
+    raw = os.urandom(message._IMAGE_CACHE_ENTRY_BYTES)
+    data_url = message._raw_data_url(raw)
+    assert data_url not in message._image_cache.values()
+
+    small = os.urandom(16)
+    assert message._raw_data_url(small) is message._raw_data_url(small)
@@ -0,0 +1,34 @@
+import json
+from pathlib import Path
+
+import nonebot
+
+from nonebot.adapters.efchat import Adapter
+from nonebot.adapters.efchat.replay import replay
+
+CHAT = {
+    "cmd": "chat",
+    "nick": "alice",
+    "trip": "abcdef",
+    "level": 105,
+    "head": "",
+    "text": "你好",
+    "time": 1700000000000,
+}
+
+
+async def test_replay_counts_handled_events(tmp_path: Path):
+    path = tmp_path / "frames.jsonl"
+    lines = [[0.0, "bot", "in", json.dumps(CHAT)] for _ in range(5)]
+    lines.append([0.0, "bot", "out", json.dumps({"cmd": "ping"})])
+    lines.append([0.0, "bot", "in", "not json"])
+    path.write_text("\n".join(json.dumps(line) for line in lines), encoding="utf-8")
+
+    adapter = nonebot.get_adapter(Adapter)
+    result = await replay(adapter, path)
+
+    assert result["frames"] == 6
+    assert result["events"] == 5
+    assert result["errors"] == 1
+    assert "_handle_event" not in vars(adapter)
+    assert not adapter.bots
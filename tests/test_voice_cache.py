@@ -0,0 +1,46 @@
+import asyncio
+
+from nonebot.adapters.efchat.voice_cache import VoiceCache
+
+
+async def test_cancelled_caller_does_not_cancel_other_waiters():
+    cache = VoiceCache()
+    started = asyncio.Event()
+    release = asyncio.Event()
+    calls = 0
+
+    async def upload() -> str:
+        nonlocal calls
+        calls += 1
+        started.set()
+        await release.wait()
+        return "static/a.mp3"
+
+    a = asyncio.create_task(cache.get_or_upload("k", upload))
+    await started.wait()
+    b = asyncio.create_task(cache.get_or_upload("k", upload))
+    await asyncio.sleep(0)
+    a.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await b == "static/a.mp3"
+    assert a.cancelled()
+    assert calls == 1
+    assert cache.get("k") == "static/a.mp3"
+
+
+async def test_upload_error_is_shared_and_not_cached():
+    cache = VoiceCache()
+
+    async def upload() -> str:
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        cache.get_or_upload("k", upload),
+        cache.get_or_upload("k", upload),
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+    assert cache.get("k") is None